@@ -1,16 +1,25 @@
 # -*- coding: utf-8 -*-
 print("### DEPLOY MARKER: V35_COMPLETE_RESTORATION_P1 ###", flush=True)
-import os, io, re, uuid, json, base64, hashlib, html, random
+import os, io, re, uuid, json, base64, hashlib, html, random, time, threading, asyncio, heapq, bisect, functools
+_boot_t0 = time.perf_counter()
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import multiprocessing
 from datetime import datetime, timedelta, timezone
-import requests
-from PIL import Image
+import unicodedata
+import httpx
 from fastapi import FastAPI, Request, Form
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, FileResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, FileResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-import psycopg2
-from psycopg2 import pool
-from contextlib import contextmanager
+import psycopg
+from psycopg_pool import ConnectionPool, AsyncConnectionPool
+from contextlib import contextmanager, asynccontextmanager, AsyncExitStack
 import gradio as gr
+from geo import GeoIndex
+# PIL/imaging 은 사진을 다룰 때 처음 import (워커 기동 시간 단축)
+
+# 기동 단계별 소요 시간(초). --preload 면 import/migrate/build 는 마스터에서 한 번만 측정됨
+BOOT = {"import": time.perf_counter() - _boot_t0}
 
 # 0) 시간 및 DB 설정
 KST = timezone(timedelta(hours=9))
@@ -18,43 +27,327 @@ def now_kst(): return datetime.now(KST)
 
 KAKAO_REST_API_KEY = os.getenv("KAKAO_REST_API_KEY", "").strip()
 KAKAO_JAVASCRIPT_KEY = os.getenv("KAKAO_JAVASCRIPT_KEY", "").strip()
+KAKAO_API_BASE = os.getenv("KAKAO_API_BASE", "https://dapi.kakao.com")  # 테스트/벤치에서는 가짜 서버 주소
+KAKAO_TIMEOUT = float(os.getenv("KAKAO_TIMEOUT", "3"))  # 초
+KAKAO_CACHE_TTL = int(os.getenv("KAKAO_CACHE_TTL", "600"))  # 초
 COOKIE_NAME = "oseyo_session"
 SESSION_HOURS = 24 * 7
+MAX_CARDS = int(os.getenv("MAX_CARDS", "60"))  # 한 화면에 미리 만들어 두는 카드 수
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+SESSION_CACHE_TTL = int(os.getenv("SESSION_CACHE_TTL", "300"))  # 초
+JANITOR_INTERVAL = int(os.getenv("JANITOR_INTERVAL", "600"))  # 초, 0 이면 끔
+JANITOR_BATCH = int(os.getenv("JANITOR_BATCH", "500"))  # 한 번에 지우는 최대 행 수
+JANITOR_MAX_BATCHES = int(os.getenv("JANITOR_MAX_BATCHES", "20"))  # 작업별 1회 실행당 최대 배치 수
+JANITOR_PAUSE = float(os.getenv("JANITOR_PAUSE", "0.2"))  # 배치 사이 쉬는 시간(초)
+JANITOR_RETRY = int(os.getenv("JANITOR_RETRY", "60"))  # 리더가 아닌 워커가 락을 다시 시도하는 간격(초)
+EVENT_RETENTION_HOURS = int(os.getenv("EVENT_RETENTION_HOURS", "24"))  # 종료 후 보관 시간
+FAV_TRACK = int(os.getenv("FAV_TRACK", "1000"))  # 메모리에서 추적하는 자주 찾는 활동 수
+FAV_FLUSH_INTERVAL = float(os.getenv("FAV_FLUSH_INTERVAL", "5"))  # 초
+ACTIVE_RESYNC = int(os.getenv("ACTIVE_RESYNC", "60"))  # 활성 활동 인덱스 전체 재동기화 주기(초)
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE_MAX = int(os.getenv("HASH_QUEUE_MAX", "16"))  # 실행 중 외 대기 허용 수
+LOGIN_LIMIT_EMAIL = int(os.getenv("LOGIN_LIMIT_EMAIL", "10"))  # 이메일당 분당 시도
+LOGIN_LIMIT_IP = int(os.getenv("LOGIN_LIMIT_IP", "30"))  # IP당 분당 시도
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "1"))  # 앞단 프록시 수 (Heroku 라우터 1), 직접 노출이면 0
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))  # 0 이면 느린 쿼리 로그 끔
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "").strip()  # 설정하면 /metrics 에 Bearer 토큰 필요
+
+# 0-0) 계측: 프로세스 단위 Prometheus 카운터/히스토그램 (텍스트 포맷은 /metrics 에서 출력)
+_metrics_lock = threading.Lock()
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+def _label_str(names, values):
+    if not names: return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{n}="{esc(v)}"' for n, v in zip(names, values)) + "}"
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, labels; self.series = {}
+        METRICS.append(self)
+    def inc(self, *lv, n=1):
+        with _metrics_lock: self.series[lv] = self.series.get(lv, 0) + n
+    def render(self):
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with _metrics_lock: items = list(self.series.items())
+        return out + [f"{self.name}{_label_str(self.labels, lv)} {v}" for lv, v in items]
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets; self.series = {}
+        METRICS.append(self)
+    def observe(self, v, *lv):
+        with _metrics_lock:
+            s = self.series.get(lv)
+            if s is None: s = self.series[lv] = [0] * len(self.buckets) + [0.0, 0]
+            for i, b in enumerate(self.buckets):
+                if v <= b: s[i] += 1
+            s[-2] += v; s[-1] += 1
+    def render(self):
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with _metrics_lock: items = [(lv, list(s)) for lv, s in self.series.items()]
+        for lv, s in items:
+            for b, c in zip(self.buckets, s):
+                out.append(f"{self.name}_bucket{_label_str(self.labels + ('le',), lv + (b,))} {c}")
+            out.append(f"{self.name}_bucket{_label_str(self.labels + ('le',), lv + ('+Inf',))} {s[-1]}")
+            out.append(f"{self.name}_sum{_label_str(self.labels, lv)} {s[-2]}")
+            out.append(f"{self.name}_count{_label_str(self.labels, lv)} {s[-1]}")
+        return out
+
+METRICS = []
+HTTP_LATENCY = Histogram("oseyo_http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status"))
+HANDLER_LATENCY = Histogram("oseyo_gradio_handler_duration_seconds", "Gradio handler latency", ("handler",))
+DB_QUERY_LATENCY = Histogram("oseyo_db_query_duration_seconds", "Per-statement query latency", ("stmt",))
+DB_ACQUIRE_LATENCY = Histogram("oseyo_db_pool_acquire_seconds", "Wait time to acquire a pooled connection")
+DB_ACQUIRES = Counter("oseyo_db_acquires_total", "Connections acquired by pool role", ("role",))
+ERRORS = Counter("oseyo_errors_total", "Swallowed errors by location", ("where",))
+
+def log_error(where, e):
+    ERRORS.inc(where); print(f"[ERR] {where}: {e!r}", flush=True)
+
+@functools.lru_cache(maxsize=512)
+def _stmt_label(q): return " ".join(q.split())[:80]
+def observe_query(query, dt):
+    label = _stmt_label(query if isinstance(query, str) else str(query))
+    DB_QUERY_LATENCY.observe(dt, label)
+    if SLOW_QUERY_MS and dt * 1000 >= SLOW_QUERY_MS: print(f"[SLOW] {dt * 1000:.1f}ms {label}", flush=True)
+
+def timed_handler(name):
+    # Gradio 핸들러용. functools.wraps 로 시그니처(gr.Request 주입)를 그대로 유지
+    def deco(fn):
+        @functools.wraps(fn)
+        async def wrapper(*a, **kw):
+            t0 = time.perf_counter()
+            try: return await fn(*a, **kw)
+            finally: HANDLER_LATENCY.observe(time.perf_counter() - t0, name)
+        return wrapper
+    return deco
+
+class TimedCursor(psycopg.Cursor):
+    def execute(self, query, params=None, **kw):
+        t0 = time.perf_counter()
+        try: return super().execute(query, params, **kw)
+        finally: observe_query(query, time.perf_counter() - t0)
+    def executemany(self, query, params_seq, **kw):
+        t0 = time.perf_counter()
+        try: return super().executemany(query, params_seq, **kw)
+        finally: observe_query(query, time.perf_counter() - t0)
+
+class TimedAsyncCursor(psycopg.AsyncCursor):
+    async def execute(self, query, params=None, **kw):
+        t0 = time.perf_counter()
+        try: return await super().execute(query, params, **kw)
+        finally: observe_query(query, time.perf_counter() - t0)
+    async def executemany(self, query, params_seq, **kw):
+        t0 = time.perf_counter()
+        try: return await super().executemany(query, params_seq, **kw)
+        finally: observe_query(query, time.perf_counter() - t0)
 
 DATABASE_URL = os.getenv("DATABASE_URL", "").replace("postgres://", "postgresql://", 1)
-db_pool = None
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "16"))  # 요청 처리용 비동기 풀
+DB_SYNC_POOL_MAX = int(os.getenv("DB_SYNC_POOL_MAX", "2"))  # 기동/정리 작업용 동기 풀
+# 읽기 복제본(쉼표로 여러 개). 비어 있으면 읽기도 primary 로
+DATABASE_REPLICA_URLS = [u.strip().replace("postgres://", "postgresql://", 1) for u in os.getenv("DATABASE_REPLICA_URL", "").split(",") if u.strip()]
+DB_REPLICA_POOL_MAX = int(os.getenv("DB_REPLICA_POOL_MAX", str(DB_POOL_MAX)))  # 복제본 하나당
+REPLICA_ACQUIRE_TIMEOUT = float(os.getenv("REPLICA_ACQUIRE_TIMEOUT", "2"))  # 초: 이 안에 복제본 연결을 못 받으면 primary 로
+REPLICA_RETRY = float(os.getenv("REPLICA_RETRY", "30"))  # 초: 실패한 복제본을 이 시간 동안 건너뜀
+RYW_WINDOW = float(os.getenv("RYW_WINDOW", "5"))  # 초: 자기 쓰기 직후 이 시간 동안은 그 사용자의 읽기도 primary 로
+# prepare=True 로 실행한 핫 쿼리는 커넥션마다 한 번만 파싱. PgBouncer transaction 모드(1.21 미만) 뒤라면 DB_PREPARE=0
+DB_PREPARE = os.getenv("DB_PREPARE", "1") != "0"
+_conn_kwargs = {"cursor_factory": TimedAsyncCursor, "prepare_threshold": 5 if DB_PREPARE else None}
+db_pool = None; apool = None; rpools = []
 try:
     if DATABASE_URL:
-        db_pool = pool.ThreadedConnectionPool(1, 20, dsn=DATABASE_URL)
-        print("[DB] Connection Pool OK.")
+        db_pool = ConnectionPool(DATABASE_URL, min_size=1, max_size=DB_SYNC_POOL_MAX, open=True, kwargs={"cursor_factory": TimedCursor})
+        # 비동기 풀은 이벤트 루프 안에서 처음 쓸 때 연다
+        apool = AsyncConnectionPool(DATABASE_URL, min_size=1, max_size=DB_POOL_MAX, open=False, kwargs=_conn_kwargs)
+        rpools = [AsyncConnectionPool(u, min_size=1, max_size=DB_REPLICA_POOL_MAX, open=False, kwargs=_conn_kwargs) for u in DATABASE_REPLICA_URLS]
+        print(f"[DB] Connection Pool OK. replicas={len(rpools)}")
 except Exception as e:
     print(f"DB Pool Error: {e}")
 
 @contextmanager
 def get_cursor():
-    global db_pool
-    conn = db_pool.getconn()
-    try:
-        with conn.cursor() as cur: yield cur
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-        raise e
-    finally:
-        db_pool.putconn(conn)
+    # 동기 커서: 마이그레이션, 백필 등 요청 경로 밖에서만 사용
+    with db_pool.connection() as conn, conn.cursor() as cur: yield cur
 
-def init_db():
-    try:
-        with get_cursor() as cur:
-            cur.execute("CREATE TABLE IF NOT EXISTS users (id TEXT PRIMARY KEY, email TEXT UNIQUE, pw_hash TEXT, name TEXT, gender TEXT, birth TEXT, created_at TEXT);")
-            cur.execute("CREATE TABLE IF NOT EXISTS sessions (token TEXT PRIMARY KEY, user_id TEXT, expires_at TEXT);")
-            cur.execute("CREATE TABLE IF NOT EXISTS email_otps (email TEXT PRIMARY KEY, otp TEXT, expires_at TEXT);")
-            cur.execute('CREATE TABLE IF NOT EXISTS events (id TEXT PRIMARY KEY, title TEXT, photo TEXT, "start" TEXT, "end" TEXT, addr TEXT, lat DOUBLE PRECISION, lng DOUBLE PRECISION, created_at TEXT, user_id TEXT, capacity INTEGER DEFAULT 10, is_unlimited INTEGER DEFAULT 0);')
-            cur.execute("CREATE TABLE IF NOT EXISTS favs (name TEXT PRIMARY KEY, count INTEGER DEFAULT 1);")
-            cur.execute("CREATE TABLE IF NOT EXISTS event_participants (event_id TEXT, user_id TEXT, joined_at TEXT, PRIMARY KEY(event_id, user_id));")
-    except: pass
+_acquire = {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+replica_down = {}  # 복제본 풀 -> 다시 써 볼 시각 (time.monotonic)
+replica_stats = {"fallbacks": 0}
+def replica_failed(pool, e):
+    if pool not in replica_down: print(f"[DB] replica unavailable for {REPLICA_RETRY:.0f}s: {e}", flush=True)
+    replica_down[pool] = time.monotonic() + REPLICA_RETRY
+def _pick_pool(readonly, uid):
+    # 읽기 전용이면 살아 있는 복제본으로. 단 uid 가 RYW_WINDOW 안에 쓴 적이 있으면 복제 지연을 피해 primary 로
+    if not (readonly and rpools) or (uid and recent_writes.get(uid)): return apool, "primary"
+    now = time.monotonic()
+    for p, until in list(replica_down.items()):
+        if until <= now: del replica_down[p]
+    healthy = [p for p in rpools if p not in replica_down]
+    return (random.choice(healthy), "replica") if healthy else (apool, "primary")
+RYW_CHANNEL = "oseyo_ryw"  # 방금 쓴 사용자 id -> 모든 워커의 recent_writes 에 기록 (다음 요청이 다른 워커로 갈 수 있음)
+async def mark_write(cur, uid):
+    # 쓰기와 같은 트랜잭션 안에서 호출. 이 워커는 바로, 다른 워커는 커밋 때 나가는 NOTIFY 로 기록한다.
+    # 알림은 커밋 직후 비동기로 도착하므로, 그보다 빨리 다른 워커에 닿는 요청은 여전히 복제본을 읽을 수 있음
+    if not (uid and rpools): return
+    recent_writes.set(uid, True)
+    await cur.execute("SELECT pg_notify(%s, %s)", (RYW_CHANNEL, uid), prepare=True)
+
+@asynccontextmanager
+async def get_acursor(readonly=False, uid=None):
+    # 요청 경로용 비동기 커서. 블록을 정상 종료하면 commit, 예외면 rollback.
+    # readonly=True 는 복제본에서 읽어도 되는 조회에만 (uid 를 넘기면 read-your-writes 보장)
+    # 복제본 연결을 못 받으면 그 복제본을 REPLICA_RETRY 초 동안 빼고 이번 요청은 primary 로 다시 받음
+    pool, role = _pick_pool(readonly, uid)
+    t0 = time.perf_counter()
+    async with AsyncExitStack() as stack:
+        try:
+            if pool.closed: await pool.open()
+            conn = await stack.enter_async_context(pool.connection(timeout=REPLICA_ACQUIRE_TIMEOUT if role == "replica" else None))
+        except psycopg.OperationalError as e:
+            if role != "replica": raise
+            replica_failed(pool, e); replica_stats["fallbacks"] += 1
+            pool, role = apool, "primary"
+            if pool.closed: await pool.open()
+            conn = await stack.enter_async_context(pool.connection())
+        DB_ACQUIRE_LATENCY.observe(time.perf_counter() - t0); DB_ACQUIRES.inc(role)
+        ms = (time.perf_counter() - t0) * 1000
+        _acquire["count"] += 1; _acquire["total_ms"] += ms; _acquire["max_ms"] = max(_acquire["max_ms"], ms)
+        try:
+            async with conn.cursor() as cur: yield cur
+        except psycopg.OperationalError as e:
+            # 받아 둔 연결이 쿼리 중에 끊긴 경우: 이번 요청은 실패하지만 다음 요청부터는 primary 로
+            if role == "replica" and conn.closed: replica_failed(pool, e)
+            raise
+
+def db_pool_stats():
+    if not apool: return {}
+    st = apool.get_stats()
+    n = _acquire["count"]
+    return {"size": st.get("pool_size", 0), "in_use": st.get("pool_size", 0) - st.get("pool_available", 0),
+            "waiters": st.get("requests_waiting", 0), "max_size": DB_POOL_MAX, "acquires": n,
+            "acquire_avg_ms": round(_acquire["total_ms"] / n, 3) if n else 0.0, "acquire_max_ms": round(_acquire["max_ms"], 3)}
+
+# 0-1) 스키마 마이그레이션: (버전, 이름, SQL 목록). 적용된 버전은 schema_migrations 에 기록
+MIGRATIONS = [
+    (1, "baseline", [
+        "CREATE TABLE IF NOT EXISTS users (id TEXT PRIMARY KEY, email TEXT UNIQUE, pw_hash TEXT, name TEXT, gender TEXT, birth TEXT, created_at TEXT);",
+        "CREATE TABLE IF NOT EXISTS sessions (token TEXT PRIMARY KEY, user_id TEXT, expires_at TEXT);",
+        "CREATE TABLE IF NOT EXISTS email_otps (email TEXT PRIMARY KEY, otp TEXT, expires_at TEXT);",
+        'CREATE TABLE IF NOT EXISTS events (id TEXT PRIMARY KEY, title TEXT, photo TEXT, "start" TEXT, "end" TEXT, addr TEXT, lat DOUBLE PRECISION, lng DOUBLE PRECISION, created_at TEXT, user_id TEXT, capacity INTEGER DEFAULT 10, is_unlimited INTEGER DEFAULT 0);',
+        "CREATE TABLE IF NOT EXISTS favs (name TEXT PRIMARY KEY, count INTEGER DEFAULT 1);",
+        "CREATE TABLE IF NOT EXISTS event_participants (event_id TEXT, user_id TEXT, joined_at TEXT, PRIMARY KEY(event_id, user_id));",
+        # 사진은 해시 단위로 한 번만 저장 (events 에는 해시만 남김)
+        "CREATE TABLE IF NOT EXISTS photo_blobs (hash TEXT, variant TEXT, mime TEXT, data BYTEA, created_at TEXT, PRIMARY KEY(hash, variant));",
+        "ALTER TABLE events ADD COLUMN IF NOT EXISTS photo_hash TEXT;",
+    ]),
+    (2, "timestamptz", [
+        'ALTER TABLE events ALTER COLUMN "start" TYPE TIMESTAMPTZ USING NULLIF("start", \'\')::timestamptz, '
+        'ALTER COLUMN "end" TYPE TIMESTAMPTZ USING NULLIF("end", \'\')::timestamptz, '
+        "ALTER COLUMN created_at TYPE TIMESTAMPTZ USING NULLIF(created_at, '')::timestamptz;",
+        # 종료 시각이 없던 활동은 시작일 23:59(KST)에 끝나는 것으로 채워 "end" 만으로 활성 여부를 판단
+        """UPDATE events SET "end" = (date_trunc('day', "start" AT TIME ZONE 'Asia/Seoul') + interval '23 hours 59 minutes') AT TIME ZONE 'Asia/Seoul' WHERE "end" IS NULL AND "start" IS NOT NULL;""",
+        "ALTER TABLE sessions ALTER COLUMN expires_at TYPE TIMESTAMPTZ USING NULLIF(expires_at, '')::timestamptz;",
+        "ALTER TABLE email_otps ALTER COLUMN expires_at TYPE TIMESTAMPTZ USING NULLIF(expires_at, '')::timestamptz;",
+        "ALTER TABLE event_participants ALTER COLUMN joined_at TYPE TIMESTAMPTZ USING NULLIF(joined_at, '')::timestamptz;",
+        "ALTER TABLE photo_blobs ALTER COLUMN created_at TYPE TIMESTAMPTZ USING NULLIF(created_at, '')::timestamptz;",
+    ]),
+    (3, "active_event_indexes", [
+        'CREATE INDEX IF NOT EXISTS events_end_idx ON events ("end");',
+        "CREATE INDEX IF NOT EXISTS events_created_at_idx ON events (created_at DESC);",
+        "CREATE INDEX IF NOT EXISTS sessions_expires_at_idx ON sessions (expires_at);",
+    ]),
+    (4, "participant_count", [
+        "ALTER TABLE events ADD COLUMN IF NOT EXISTS participant_count INTEGER NOT NULL DEFAULT 0;",
+        "UPDATE events e SET participant_count = c.n FROM (SELECT event_id, COUNT(*) AS n FROM event_participants GROUP BY event_id) c WHERE c.event_id = e.id;",
+        "CREATE INDEX IF NOT EXISTS event_participants_user_idx ON event_participants (user_id);",
+    ]),
+    (5, "feed_notify", [
+        # 활동 생성/삭제/인원 변경을 oseyo_feed 채널로 알림 (커밋 시점에 전달됨)
+        """CREATE OR REPLACE FUNCTION oseyo_feed_notify() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                PERFORM pg_notify('oseyo_feed', json_build_object('op', 'delete', 'id', OLD.id)::text);
+            ELSIF TG_OP = 'INSERT' THEN
+                PERFORM pg_notify('oseyo_feed', json_build_object('op', 'create', 'id', NEW.id)::text);
+            ELSE
+                PERFORM pg_notify('oseyo_feed', json_build_object('op', 'count', 'id', NEW.id, 'count', NEW.participant_count)::text);
+            END IF;
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql;""",
+        "DROP TRIGGER IF EXISTS events_feed_notify ON events;",
+        "CREATE TRIGGER events_feed_notify AFTER INSERT OR DELETE OR UPDATE OF participant_count ON events FOR EACH ROW EXECUTE FUNCTION oseyo_feed_notify();",
+    ]),
+    (6, "janitor_indexes", [
+        "CREATE INDEX IF NOT EXISTS email_otps_expires_at_idx ON email_otps (expires_at);",
+        "CREATE INDEX IF NOT EXISTS events_photo_hash_idx ON events (photo_hash);",
+        # 이미 끝난 활동을 정리하며 지울 때는 피드 알림을 보내지 않음
+        """CREATE OR REPLACE FUNCTION oseyo_feed_notify() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                IF OLD."end" > now() THEN
+                    PERFORM pg_notify('oseyo_feed', json_build_object('op', 'delete', 'id', OLD.id)::text);
+                END IF;
+            ELSIF TG_OP = 'INSERT' THEN
+                PERFORM pg_notify('oseyo_feed', json_build_object('op', 'create', 'id', NEW.id)::text);
+            ELSE
+                PERFORM pg_notify('oseyo_feed', json_build_object('op', 'count', 'id', NEW.id, 'count', NEW.participant_count)::text);
+            END IF;
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql;""",
+    ]),
+    (7, "favs_count_idx", [
+        "CREATE INDEX IF NOT EXISTS favs_count_idx ON favs (count DESC);",
+    ]),
+    (8, "events_keyset_idx", [
+        # /api/events 키셋 페이지네이션용 (created_at, id) 역순 인덱스
+        "CREATE INDEX IF NOT EXISTS events_created_id_idx ON events (created_at DESC, id DESC);",
+    ]),
+    (9, "feed_notify_photo", [
+        # 사진은 활동을 만든 뒤 백그라운드에서 붙이므로 photo_hash 변경도 알림
+        """CREATE OR REPLACE FUNCTION oseyo_feed_notify() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                IF OLD."end" > now() THEN
+                    PERFORM pg_notify('oseyo_feed', json_build_object('op', 'delete', 'id', OLD.id)::text);
+                END IF;
+            ELSIF TG_OP = 'INSERT' THEN
+                PERFORM pg_notify('oseyo_feed', json_build_object('op', 'create', 'id', NEW.id)::text);
+            ELSE
+                IF NEW.participant_count IS DISTINCT FROM OLD.participant_count THEN
+                    PERFORM pg_notify('oseyo_feed', json_build_object('op', 'count', 'id', NEW.id, 'count', NEW.participant_count)::text);
+                END IF;
+                IF NEW.photo_hash IS DISTINCT FROM OLD.photo_hash THEN
+                    PERFORM pg_notify('oseyo_feed', json_build_object('op', 'photo', 'id', NEW.id, 'photo_hash', NEW.photo_hash)::text);
+                END IF;
+            END IF;
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql;""",
+        "DROP TRIGGER IF EXISTS events_feed_notify ON events;",
+        "CREATE TRIGGER events_feed_notify AFTER INSERT OR DELETE OR UPDATE OF participant_count, photo_hash ON events FOR EACH ROW EXECUTE FUNCTION oseyo_feed_notify();",
+    ]),
+]
+MIGRATION_LOCK = 73020001  # pg_advisory_lock 키: 여러 워커가 동시에 돌려도 한 번만 적용
 
-if db_pool: init_db()
+def run_migrations():
+    with db_pool.connection() as conn:
+        conn.autocommit = True
+        conn.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK,))
+        try:
+            conn.execute("CREATE TABLE IF NOT EXISTS schema_migrations (version INTEGER PRIMARY KEY, name TEXT, applied_at TIMESTAMPTZ DEFAULT now());")
+            done = {r[0] for r in conn.execute("SELECT version FROM schema_migrations").fetchall()}
+            for version, name, stmts in MIGRATIONS:
+                if version in done: continue
+                with conn.transaction():
+                    for sql in stmts: conn.execute(sql)
+                    conn.execute("INSERT INTO schema_migrations(version, name) VALUES(%s,%s)", (version, name))
+                print(f"[DB] migration {version} {name} applied")
+        finally:
+            conn.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK,))
+            conn.autocommit = False
+
+def init_db():
+    try: run_migrations()
+    except Exception as e: log_error("migrations", e)
 
 # 1) 유틸리티
 def pw_hash(p, s): return f"{s}${hashlib.pbkdf2_hmac('sha256', p.encode(), s.encode(), 150000).hex()}"
@@ -62,39 +355,290 @@ def pw_verify(p, st):
     try: s, _ = st.split('$', 1); return pw_hash(p, s) == st
     except: return False
 def encode_img_to_b64(img_np):
+    from PIL import Image
     if img_np is None: return ""
     im = Image.fromarray(img_np.astype("uint8")).convert("RGB")
     buf = io.BytesIO()
     im.save(buf, format="JPEG", quality=80)
     return base64.b64encode(buf.getvalue()).decode("utf-8")
 def decode_photo(b64):
+    from PIL import Image
     if not b64: return None
     try: return Image.open(io.BytesIO(base64.b64decode(b64))).convert("RGB")
     except: return None
+
+# 1-1) 사진 저장소: 크기(thumb/full) x 포맷(AVIF/WebP/JPEG) 변형을 해시 키로 photo_blobs 에 보관
+# 인코딩은 imaging.py 에서 하고, 업로드는 별도 프로세스 풀에서 돌려 요청 스레드를 막지 않는다.
+PHOTO_WORKERS = int(os.getenv("PHOTO_WORKERS", "2"))
+PHOTO_BACKFILL_BATCHES = int(os.getenv("PHOTO_BACKFILL_BATCHES", "5"))  # 기동 1회당 옮기는 최대 배치 수 (나머지는 다음 기동에)
+PHOTO_INSERT = "INSERT INTO photo_blobs(hash, variant, mime, data, created_at) VALUES(%s,%s,%s,%s,%s) ON CONFLICT DO NOTHING"
+_photo_pool = None
+def photo_pool():
+    # spawn: 자식은 imaging 모듈만 import 한다 (fork 로 앱 상태를 복사하지 않음)
+    global _photo_pool
+    if _photo_pool is None: _photo_pool = ProcessPoolExecutor(max_workers=PHOTO_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _photo_pool
+def _photo_rows(h, variants):
+    ts = now_kst()
+    return [(h, v, mime, data, ts) for v, mime, data in variants]
+def store_photo_image(im):
+    if im is None: return None
+    import imaging
+    h, variants = imaging.encode_variants(im)
+    with get_cursor() as cur: cur.executemany(PHOTO_INSERT, _photo_rows(h, variants))
+    return h
+def photo_too_large(img_np):
+    import imaging
+    return img_np is not None and img_np.shape[0] * img_np.shape[1] > imaging.MAX_PIXELS
+async def store_photo(img_np):
+    if img_np is None or photo_too_large(img_np): return None
+    import imaging
+    res = await asyncio.get_running_loop().run_in_executor(photo_pool(), imaging.process_upload, img_np)
+    if not res: return None
+    h, variants = res
+    async with get_acursor() as cur: await cur.executemany(PHOTO_INSERT, _photo_rows(h, variants))
+    return h
+_photo_tasks = set()  # 진행 중인 사진 붙이기 작업 (GC 로 사라지지 않게 참조 유지)
+async def attach_photo(eid, img_np):
+    # 활동 행은 먼저 만들고, 인코딩(수백 ms)이 끝나면 photo_hash 만 채움.
+    # 피드 트리거가 'photo' 알림을 보내 다른 워커/브라우저의 카드도 다시 그려짐
+    try:
+        h = await store_photo(img_np)
+        if not h: return
+        async with get_acursor() as cur: await cur.execute("UPDATE events SET photo_hash=%s WHERE id=%s", (h, eid))
+        active_index.set_photo(eid, h)
+    except Exception as e: log_error("attach_photo", e)
+def attach_photo_later(eid, img_np):
+    if img_np is None: return
+    t = asyncio.create_task(attach_photo(eid, img_np))
+    _photo_tasks.add(t); t.add_done_callback(_photo_tasks.discard)
+PHOTO_SQL = "SELECT variant, mime, data FROM photo_blobs WHERE hash=%s AND variant = ANY(%s) ORDER BY array_position(%s, variant) LIMIT 1"
+async def load_photo(h, variants):
+    # variants 는 선호 순서. 저장돼 있는 것 중 첫 번째를 (variant, mime, bytes) 로
+    async with get_acursor(readonly=True) as cur:
+        await cur.execute(PHOTO_SQL, (h, variants, variants), prepare=True)
+        row = await cur.fetchone()
+    if not row and rpools:  # 방금 올린 사진이 아직 복제되지 않았을 수 있음
+        async with get_acursor() as cur:
+            await cur.execute(PHOTO_SQL, (h, variants, variants), prepare=True)
+            row = await cur.fetchone()
+    return (row[0], row[1], bytes(row[2])) if row else None
+def photo_url(h, variant="thumb"): return f"/photos/{h}?v={variant}" if h else ""
+def backfill_photos(batch=20, max_batches=PHOTO_BACKFILL_BATCHES):
+    # 예전 events.photo(base64) 행을 photo_blobs 로 옮기고 원래 컬럼은 비움.
+    # 기동 경로(--preload 면 마스터)에서 돌기 때문에 한 번에 max_batches 배치까지만 처리
+    try:
+        for _ in range(max_batches):
+            with get_cursor() as cur:
+                cur.execute("SELECT id, photo FROM events WHERE photo_hash IS NULL AND photo IS NOT NULL AND photo <> '' LIMIT %s", (batch,))
+                rows = cur.fetchall()
+            if not rows: break
+            for eid, b64 in rows:
+                h = store_photo_image(decode_photo(b64))
+                with get_cursor() as cur:
+                    cur.execute("UPDATE events SET photo_hash=%s, photo=NULL WHERE id=%s", (h, eid))
+    except Exception as e: print(f"[PHOTO] backfill error: {e}")
+
+_t = time.perf_counter()
+if db_pool:
+    init_db(); backfill_photos()
+    # 동기 풀은 기동 작업에만 쓰므로 바로 닫음. --preload 시 마스터의 커넥션/스레드가 fork 로 워커에 새지 않게 함
+    db_pool.close()
+BOOT["migrate"] = time.perf_counter() - _t
+
+def as_kst(v):
+    # timestamptz(datetime) 와 예전 ISO 문자열을 모두 KST datetime 으로
+    if v is None or v == "": return None
+    dt = v if isinstance(v, datetime) else datetime.fromisoformat(str(v).replace("Z", "+00:00"))
+    return dt.astimezone(KST) if dt.tzinfo else dt.replace(tzinfo=KST)
 def fmt_start(s):
-    try: return datetime.fromisoformat(str(s).replace("Z", "+00:00")).strftime("%m월 %d일 %H:%M")
+    try: return as_kst(s).strftime("%m월 %d일 %H:%M")
     except: return str(s or "")
 def remain_text(e, s=None):
     now = now_kst()
     try:
-        edt = datetime.fromisoformat(str(e or s).replace("Z", "+00:00"))
+        edt = as_kst(e or s)
         if not e: edt = edt.replace(hour=23, minute=59)
         if edt < now: return "종료됨"
         m = int((edt - now).total_seconds() // 60)
         return f"남음 {m//1440}일 { (m//60)%24 }시간" if m > 60 else f"남음 {m}분"
     except: return ""
 
+# 1-2) 프로세스 내 TTL + LRU 캐시
+class TTLCache:
+    def __init__(self, maxsize, ttl):
+        self.maxsize, self.ttl = maxsize, ttl
+        self._d = OrderedDict(); self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+    def get(self, k):
+        now = time.monotonic()
+        with self._lock:
+            item = self._d.get(k)
+            if item is None or item[1] <= now:
+                if item is not None: del self._d[k]
+                self.misses += 1; return None
+            self._d.move_to_end(k); self.hits += 1
+            return item[0]
+    def set(self, k, v, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0: return
+        with self._lock:
+            self._d[k] = (v, time.monotonic() + ttl); self._d.move_to_end(k)
+            while len(self._d) > self.maxsize: self._d.popitem(last=False); self.evictions += 1
+    def pop(self, k):
+        with self._lock: self._d.pop(k, None)
+    def clear(self):
+        with self._lock: self._d.clear()
+    def stats(self):
+        with self._lock: size = len(self._d)
+        total = self.hits + self.misses
+        return {"size": size, "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "hit_ratio": round(self.hits / total, 4) if total else 0.0}
+
+class RateLimiter:
+    # 고정 윈도우 카운터: 첫 시도 시각부터 window 초 동안 limit 회까지 허용
+    def __init__(self, limit, window=60, maxsize=100000):
+        self.limit = limit; self._c = TTLCache(maxsize, window)
+    def allow(self, key):
+        c = self._c.get(key)
+        if c is None: self._c.set(key, [1]); return True
+        c[0] += 1
+        return c[0] <= self.limit
+
+# 최근에 쓴 사용자 -> 읽기를 primary 로 고정 (_pick_pool 참고)
+recent_writes = TTLCache(int(os.getenv("RYW_TRACK", "10000")), RYW_WINDOW)
+
+# 1-3) 비밀번호 해시 전용 워커 풀 (이벤트 루프 블로킹 방지)
+# pbkdf2_hmac 은 계산 중 GIL 을 놓으므로 스레드 풀로 충분하다.
+class HashBusy(Exception): pass
+_hash_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="pwhash")
+_hash_inflight = 0  # 이벤트 루프 스레드에서만 변경
+async def run_hash(fn, *args):
+    global _hash_inflight
+    if _hash_inflight >= HASH_WORKERS + HASH_QUEUE_MAX: raise HashBusy()
+    _hash_inflight += 1
+    try: return await asyncio.get_running_loop().run_in_executor(_hash_pool, fn, *args)
+    finally: _hash_inflight -= 1
+async def pw_verify_async(p, st): return await run_hash(pw_verify, p, st)
+def hash_pool_stats(): return {"workers": HASH_WORKERS, "queue_max": HASH_QUEUE_MAX, "inflight": _hash_inflight}
+
+# 1-4) 위치 인덱스(GeoIndex)는 geo.py
+
+# 1-5) 카카오 장소 검색: keep-alive 클라이언트 + 결과 캐시 + 동일 검색어 합치기 + 차단기
+class CircuitBreaker:
+    # 연속 threshold 회 실패하면 열림(open): cooldown 초 동안 호출을 막음.
+    # cooldown 이 지나면 반열림(half-open): 시험 호출 하나만 보내고, 그게 성공해야 닫힘. 실패하면 다시 cooldown
+    def __init__(self, threshold=5, cooldown=30):
+        self.threshold, self.cooldown = threshold, cooldown
+        self.fails = 0; self.opened_at = 0.0; self.probe_at = None  # probe_at: 나가 있는 시험 호출 시각
+    @property
+    def state(self):
+        if self.fails < self.threshold: return "closed"
+        return "half_open" if self.probe_at is not None else "open"
+    def allow(self):
+        if self.fails < self.threshold: return True
+        now = time.monotonic()
+        if now - self.opened_at < self.cooldown: return False
+        # 시험 호출이 결과 없이 사라진 경우(취소 등)를 대비해 cooldown 이 지나면 다음 시험을 허용
+        if self.probe_at is not None and now - self.probe_at < self.cooldown: return False
+        self.probe_at = now; return True
+    def success(self): self.fails = 0; self.probe_at = None
+    def failure(self):
+        self.fails += 1; self.probe_at = None
+        if self.fails >= self.threshold: self.opened_at = time.monotonic()
+
+kakao_cache = TTLCache(int(os.getenv("KAKAO_CACHE_SIZE", "2000")), KAKAO_CACHE_TTL)  # 정규화 검색어 -> documents
+kakao_breaker = CircuitBreaker(int(os.getenv("KAKAO_BREAKER_FAILS", "5")), int(os.getenv("KAKAO_BREAKER_COOLDOWN", "30")))
+kakao_stats = {"upstream": 0, "coalesced": 0, "errors": 0, "rejected": 0}
+_kakao_inflight = {}  # 정규화 검색어 -> 진행 중인 Task
+_kakao_client = None
+def normalize_keyword(kw): return " ".join(unicodedata.normalize("NFKC", str(kw or "")).split()).lower()
+def _kakao_http():
+    global _kakao_client
+    if _kakao_client is None:
+        _kakao_client = httpx.AsyncClient(base_url=KAKAO_API_BASE, timeout=KAKAO_TIMEOUT,
+                                          headers={"Authorization": f"KakaoAK {KAKAO_REST_API_KEY}"},
+                                          limits=httpx.Limits(max_connections=20, max_keepalive_connections=10))
+    return _kakao_client
+async def _kakao_fetch(key, size):
+    if not kakao_breaker.allow():
+        kakao_stats["rejected"] += 1; return None
+    kakao_stats["upstream"] += 1
+    try:
+        r = await _kakao_http().get("/v2/local/search/keyword.json", params={"query": key, "size": size})
+        r.raise_for_status()
+        docs = r.json().get("documents", [])
+    except Exception as e:
+        kakao_stats["errors"] += 1; kakao_breaker.failure()
+        print(f"[KAKAO] search error: {e}"); return None
+    kakao_breaker.success(); kakao_cache.set(key, docs)
+    return docs
+async def kakao_search(keyword, size=15):
+    key = normalize_keyword(keyword)
+    if not key: return []
+    docs = kakao_cache.get(key)
+    if docs is not None: return docs
+    task = _kakao_inflight.get(key)
+    if task: kakao_stats["coalesced"] += 1
+    else:
+        task = _kakao_inflight[key] = asyncio.ensure_future(_kakao_fetch(key, size))
+        task.add_done_callback(lambda _t: _kakao_inflight.pop(key, None))
+    return (await asyncio.shield(task)) or []  # 실패/차단 시에는 캐시하지 않고 빈 결과
+
+# 1-6) 자주 찾는 활동 top-K: Space-Saving 으로 상위 capacity 개만 추적.
+# 증가분은 pending 에 모았다가 주기적으로 DB 에 한 번에 반영 (write-behind)
+class FavCounter:
+    def __init__(self, capacity=FAV_TRACK):
+        self.capacity = capacity; self.counts = {}; self.pending = {}
+    def incr(self, name, n=1):
+        self.pending[name] = self.pending.get(name, 0) + n
+        if name in self.counts: self.counts[name] += n
+        elif len(self.counts) < self.capacity: self.counts[name] = n
+        else:
+            # 가장 작은 항목을 내보내고 그 값을 물려받음 (Space-Saving 의 과대추정 상한)
+            low = min(self.counts, key=self.counts.get)
+            self.counts[name] = self.counts.pop(low) + n
+    def top(self, k=10): return [n for n, _ in heapq.nlargest(k, self.counts.items(), key=lambda x: x[1])]
+    def take_pending(self):
+        p, self.pending = self.pending, {}
+        return p
+    def reload(self, rows):
+        # DB 의 상위 행(다른 워커 반영분 포함)에 아직 못 쓴 증가분을 더해 다시 구성
+        self.counts = {n: int(c) for n, c in rows}
+        for n, d in self.pending.items(): self.counts[n] = self.counts.get(n, 0) + d
+
 # 2) FastAPI & Auth
 app = FastAPI(redirect_slashes=False)
-def get_user_id_from_req(request: Request):
+login_limit_email = RateLimiter(LOGIN_LIMIT_EMAIL)
+login_limit_ip = RateLimiter(LOGIN_LIMIT_IP)
+def client_ip(request: Request):
+    # X-Forwarded-For 의 왼쪽 값은 클라이언트가 마음대로 넣을 수 있음. 신뢰하는 프록시(Heroku 라우터 등)가
+    # 오른쪽에 덧붙인 TRUSTED_PROXY_HOPS 번째 값을 쓰고, 0 이면 헤더를 무시
+    peer = request.client.host if request.client else ""
+    if not TRUSTED_PROXY_HOPS: return peer
+    hops = [h.strip() for h in request.headers.get("x-forwarded-for", "").split(",") if h.strip()]
+    return hops[-TRUSTED_PROXY_HOPS] if len(hops) >= TRUSTED_PROXY_HOPS else peer
+session_cache = TTLCache(SESSION_CACHE_SIZE, SESSION_CACHE_TTL)  # token -> user_id
+
+SESSION_SQL = "SELECT user_id, expires_at FROM sessions WHERE token=%s"
+async def get_user_id_from_req(request: Request):
     t = request.cookies.get(COOKIE_NAME)
     if not t: return None
+    uid = session_cache.get(t)
+    if uid: return uid
     try:
-        with get_cursor() as cur:
-            cur.execute("SELECT user_id, expires_at FROM sessions WHERE token=%s", (t,))
-            row = cur.fetchone()
-            if row and datetime.fromisoformat(row[1]) > now_kst(): return row[0]
-    except: pass
+        # 캐시 미스는 primary 에서 읽음: 복제본은 방금 로그아웃으로 지운 세션을 아직 갖고 있을 수 있고,
+        # 그걸 캐시하면 SESSION_CHANNEL 알림이 이미 지나간 뒤라 TTL 동안 로그아웃이 무시됨
+        async with get_acursor() as cur:
+            await cur.execute(SESSION_SQL, (t,), prepare=True)
+            row = await cur.fetchone()
+        if row:
+            left = (as_kst(row[1]) - now_kst()).total_seconds()
+            if left > 0:
+                feed_hub.start()  # 다른 워커의 로그아웃 알림을 받고 있어야 캐시해도 안전
+                session_cache.set(t, row[0], ttl=left)  # 세션 만료 시각을 넘겨 캐시하지 않음
+                return row[0]
+    except Exception as e: log_error("session_lookup", e)
     return None
 
 LOGIN_HTML = """
@@ -107,185 +651,372 @@ LOGIN_HTML = """
 async def login_get(err: str = ""): return HTMLResponse(LOGIN_HTML.replace("__ERROR_BLOCK__", err))
 
 @app.post("/login")
-async def login_post(email: str = Form(...), password: str = Form(...)):
+async def login_post(request: Request, email: str = Form(...), password: str = Form(...)):
+    email = email.strip().lower()
+    # 해시 풀에 들어가기 전에 이메일/IP 단위로 먼저 걸러냄
+    if not (login_limit_ip.allow(client_ip(request)) and login_limit_email.allow(email)):
+        return RedirectResponse(url="/login?err=TooManyAttempts", status_code=303)
     try:
-        with get_cursor() as cur:
-            cur.execute("SELECT id, pw_hash FROM users WHERE email=%s", (email.strip().lower(),))
-            row = cur.fetchone()
-            if row and pw_verify(password, row[1]):
-                token = uuid.uuid4().hex
-                cur.execute("INSERT INTO sessions(token, user_id, expires_at) VALUES(%s,%s,%s)", (token, row[0], (now_kst()+timedelta(hours=SESSION_HOURS)).isoformat()))
-                resp = RedirectResponse(url="/", status_code=303)
-                resp.set_cookie(COOKIE_NAME, token, max_age=SESSION_HOURS*3600, httponly=True, samesite="lax", path="/")
-                return resp
-    except: pass
+        async with get_acursor(readonly=True) as cur:
+            await cur.execute("SELECT id, pw_hash FROM users WHERE email=%s", (email,), prepare=True)
+            row = await cur.fetchone()
+        # 해시 계산 동안 DB 커넥션을 잡고 있지 않음
+        if row and await pw_verify_async(password, row[1]):
+            token = uuid.uuid4().hex
+            async with get_acursor() as cur:
+                await cur.execute("INSERT INTO sessions(token, user_id, expires_at) VALUES(%s,%s,%s)", (token, row[0], now_kst()+timedelta(hours=SESSION_HOURS)))
+            resp = RedirectResponse(url="/", status_code=303)
+            resp.set_cookie(COOKIE_NAME, token, max_age=SESSION_HOURS*3600, httponly=True, samesite="lax", path="/")
+            return resp
+    except HashBusy:
+        return RedirectResponse(url="/login?err=TryAgain", status_code=303)
+    except Exception as e: log_error("login", e)
     return RedirectResponse(url="/login?err=LoginFail", status_code=303)
 
-# (P2 회원가입 로직으로 계속...)
-# -*- coding: utf-8 -*-
-print("### DEPLOY MARKER: V35_COMPLETE_RESTORATION_P1 ###", flush=True)
-import os, io, re, uuid, json, base64, hashlib, html, random
-from datetime import datetime, timedelta, timezone
-import requests
-from PIL import Image
-from fastapi import FastAPI, Request, Form
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
-import psycopg2
-from psycopg2 import pool
-from contextlib import contextmanager
-import gradio as gr
+@app.get("/logout")
+async def logout(request: Request):
+    t = request.cookies.get(COOKIE_NAME)
+    if t:
+        session_cache.pop(t)
+        try:
+            async with get_acursor() as cur:
+                await cur.execute("DELETE FROM sessions WHERE token=%s", (t,))
+                await cur.execute("SELECT pg_notify(%s, %s)", (SESSION_CHANNEL, t))  # 커밋 시 다른 워커 캐시에서도 제거
+        except Exception as e: log_error("logout", e)
+    resp = RedirectResponse(url="/login", status_code=303)
+    resp.delete_cookie(COOKIE_NAME, path="/")
+    return resp
 
-# 0) 시간 및 DB 설정
-KST = timezone(timedelta(hours=9))
-def now_kst(): return datetime.now(KST)
+# 2-1) 실시간 피드: 워커마다 LISTEN 연결 하나를 두고 SSE 구독자에게 나눠줌.
+# NOTIFY 는 모든 LISTEN 세션에 전달되므로 gunicorn 워커가 여러 개여도 각자 받는다.
+FEED_CHANNEL = "oseyo_feed"
+SESSION_CHANNEL = "oseyo_session"  # 로그아웃한 세션 토큰 -> 모든 워커의 session_cache 에서 제거
+class FeedHub:
+    def __init__(self):
+        self.subs = set(); self.listeners = []; self.task = None; self.received = 0
+        self.channels = {FEED_CHANNEL: self.publish}  # 채널 -> payload 처리 함수
+        self.on_connect = []  # (재)연결 직후 호출. 끊긴 동안 놓친 알림을 메우는 용도
+    def start(self):
+        if self.task is None or self.task.done(): self.task = asyncio.create_task(self._listen())
+    def subscribe(self):
+        q = asyncio.Queue(maxsize=100); self.subs.add(q)
+        self.start()
+        return q
+    def unsubscribe(self, q): self.subs.discard(q)
+    def publish(self, payload):
+        self.received += 1
+        for fn in self.listeners:  # 프로세스 내부 구독자 (활성 활동 인덱스 등)
+            try: fn(payload)
+            except Exception as e: print(f"[FEED] listener callback error: {e}")
+        for q in list(self.subs):
+            try: q.put_nowait(payload)
+            except asyncio.QueueFull: pass  # 밀린 구독자는 건너뜀 (다음 알림 때 어차피 새로 그림)
+    async def _listen(self):
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(DATABASE_URL, autocommit=True) as conn:
+                    for ch in self.channels: await conn.execute(f"LISTEN {ch}")
+                    for fn in self.on_connect: fn()
+                    async for n in conn.notifies(): self.channels.get(n.channel, self.publish)(n.payload)
+            except asyncio.CancelledError: raise
+            except Exception as e:
+                print(f"[FEED] listener error: {e}")
+                await asyncio.sleep(2)
+feed_hub = FeedHub()
+feed_hub.channels[SESSION_CHANNEL] = session_cache.pop
+feed_hub.on_connect.append(session_cache.clear)  # 끊긴 사이의 로그아웃을 놓쳤을 수 있으므로 비움
+feed_hub.channels[RYW_CHANNEL] = lambda uid: recent_writes.set(uid, True)
 
-KAKAO_REST_API_KEY = os.getenv("KAKAO_REST_API_KEY", "").strip()
-KAKAO_JAVASCRIPT_KEY = os.getenv("KAKAO_JAVASCRIPT_KEY", "").strip()
-COOKIE_NAME = "oseyo_session"
-SESSION_HOURS = 24 * 7
+@app.get("/feed/stream")
+async def feed_stream(request: Request):
+    if not await get_user_id_from_req(request): return Response(status_code=401)
+    q = feed_hub.subscribe()
+    async def gen():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try: payload = await asyncio.wait_for(q.get(), timeout=15)
+                except asyncio.TimeoutError: yield ": ping\n\n"; continue
+                yield f"data: {payload}\n\n"
+        finally: feed_hub.unsubscribe(q)
+    return StreamingResponse(gen(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
-DATABASE_URL = os.getenv("DATABASE_URL", "").replace("postgres://", "postgresql://", 1)
-db_pool = None
-try:
-    if DATABASE_URL:
-        db_pool = pool.ThreadedConnectionPool(1, 20, dsn=DATABASE_URL)
-        print("[DB] Connection Pool OK.")
-except Exception as e:
-    print(f"DB Pool Error: {e}")
+# 2-2) 청소 작업: 만료 세션/OTP, 끝난 활동(+참여자), 주인 없는 사진을 배치로 삭제.
+# 리더 선출: 워커마다 전용 연결로 세션 advisory lock 을 시도하고, 잡은 워커(리더)는 그 연결을 계속 쥔 채
+# JANITOR_INTERVAL 마다 청소한다. 나머지는 JANITOR_RETRY 초마다 다시 시도하다가 리더 연결이 끊겨 락이 풀리면 이어받음.
+JANITOR_LOCK = 73020002
+# (이름, SQL, 같이 지운 부속 테이블) — 부속 테이블이 있으면 SQL 이 (본 테이블, 부속 테이블) 삭제 건수를 돌려줌
+JANITOR_JOBS = [
+    ("sessions", "DELETE FROM sessions WHERE token IN (SELECT token FROM sessions WHERE expires_at < now() LIMIT %(n)s)", None),
+    ("email_otps", "DELETE FROM email_otps WHERE email IN (SELECT email FROM email_otps WHERE expires_at < now() LIMIT %(n)s)", None),
+    ("events", """WITH ev AS (SELECT id FROM events WHERE "end" < now() - make_interval(hours => %(keep)s) LIMIT %(n)s),
+        p AS (DELETE FROM event_participants WHERE event_id IN (SELECT id FROM ev) RETURNING 1),
+        e AS (DELETE FROM events WHERE id IN (SELECT id FROM ev) RETURNING 1)
+        SELECT (SELECT count(*) FROM e), (SELECT count(*) FROM p)""", "event_participants"),
+    # 업로드 직후 아직 활동에 연결되지 않은 사진은 1시간 동안 남겨 둠
+    ("photo_blobs", """DELETE FROM photo_blobs WHERE hash IN (
+        SELECT b.hash FROM photo_blobs b WHERE b.created_at < now() - interval '1 hour'
+        AND NOT EXISTS (SELECT 1 FROM events e WHERE e.photo_hash = b.hash) LIMIT %(n)s)""", None),
+]
+janitor_stats = {"runs": 0, "last": None, "leader": False}
 
-@contextmanager
-def get_cursor():
-    global db_pool
-    conn = db_pool.getconn()
-    try:
-        with conn.cursor() as cur: yield cur
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-        raise e
-    finally:
-        db_pool.putconn(conn)
+async def janitor_run(conn):
+    # conn: 리더가 락을 쥐고 있는 autocommit 연결 (배치마다 바로 커밋해 잠금을 짧게 유지)
+    t0 = time.perf_counter(); removed = {}
+    for name, sql, extra in JANITOR_JOBS:
+        removed[name] = 0
+        if extra: removed[extra] = 0
+        for _ in range(JANITOR_MAX_BATCHES):
+            cur = await conn.execute(sql, {"n": JANITOR_BATCH, "keep": EVENT_RETENTION_HOURS})
+            if extra: n, m = await cur.fetchone(); removed[extra] += m
+            else: n = max(cur.rowcount, 0)
+            removed[name] += n
+            if n < JANITOR_BATCH: break
+            await asyncio.sleep(JANITOR_PAUSE)
+    report = {"removed": removed, "ms": round((time.perf_counter() - t0) * 1000, 1), "at": now_kst().isoformat()}
+    janitor_stats["runs"] += 1; janitor_stats["last"] = report
+    print(f"[JANITOR] {report}", flush=True)
+    return report
 
-def init_db():
-    try:
-        with get_cursor() as cur:
-            cur.execute("CREATE TABLE IF NOT EXISTS users (id TEXT PRIMARY KEY, email TEXT UNIQUE, pw_hash TEXT, name TEXT, gender TEXT, birth TEXT, created_at TEXT);")
-            cur.execute("CREATE TABLE IF NOT EXISTS sessions (token TEXT PRIMARY KEY, user_id TEXT, expires_at TEXT);")
-            cur.execute("CREATE TABLE IF NOT EXISTS email_otps (email TEXT PRIMARY KEY, otp TEXT, expires_at TEXT);")
-            cur.execute('CREATE TABLE IF NOT EXISTS events (id TEXT PRIMARY KEY, title TEXT, photo TEXT, "start" TEXT, "end" TEXT, addr TEXT, lat DOUBLE PRECISION, lng DOUBLE PRECISION, created_at TEXT, user_id TEXT, capacity INTEGER DEFAULT 10, is_unlimited INTEGER DEFAULT 0);')
-            cur.execute("CREATE TABLE IF NOT EXISTS favs (name TEXT PRIMARY KEY, count INTEGER DEFAULT 1);")
-            cur.execute("CREATE TABLE IF NOT EXISTS event_participants (event_id TEXT, user_id TEXT, joined_at TEXT, PRIMARY KEY(event_id, user_id));")
-    except: pass
+async def janitor_loop():
+    await asyncio.sleep(random.uniform(5, 30))  # 워커들이 동시에 깨지 않도록
+    while True:
+        try:
+            async with await psycopg.AsyncConnection.connect(DATABASE_URL, autocommit=True) as conn:
+                cur = await conn.execute("SELECT pg_try_advisory_lock(%s)", (JANITOR_LOCK,))
+                if (await cur.fetchone())[0]:
+                    janitor_stats["leader"] = True; print(f"[JANITOR] leader pid={os.getpid()}", flush=True)
+                    try:
+                        while True:  # 락은 연결이 살아 있는 동안 유지되고, 끊기면 서버가 풀어 줌
+                            await janitor_run(conn)
+                            await asyncio.sleep(JANITOR_INTERVAL)
+                    finally: janitor_stats["leader"] = False
+        except asyncio.CancelledError: raise
+        except Exception as e: print(f"[JANITOR] error: {e}")
+        await asyncio.sleep(JANITOR_RETRY)
 
-if db_pool: init_db()
+_janitor_task = None
+@app.on_event("startup")
+async def start_janitor():
+    global _janitor_task
+    if apool and JANITOR_INTERVAL > 0: _janitor_task = asyncio.create_task(janitor_loop())
 
-# 1) 유틸리티
-def pw_hash(p, s): return f"{s}${hashlib.pbkdf2_hmac('sha256', p.encode(), s.encode(), 150000).hex()}"
-def pw_verify(p, st):
-    try: s, _ = st.split('$', 1); return pw_hash(p, s) == st
-    except: return False
-def encode_img_to_b64(img_np):
-    if img_np is None: return ""
-    im = Image.fromarray(img_np.astype("uint8")).convert("RGB")
-    buf = io.BytesIO()
-    im.save(buf, format="JPEG", quality=80)
-    return base64.b64encode(buf.getvalue()).decode("utf-8")
-def decode_photo(b64):
-    if not b64: return None
-    try: return Image.open(io.BytesIO(base64.b64decode(b64))).convert("RGB")
-    except: return None
-def fmt_start(s):
-    try: return datetime.fromisoformat(str(s).replace("Z", "+00:00")).strftime("%m월 %d일 %H:%M")
-    except: return str(s or "")
-def remain_text(e, s=None):
-    now = now_kst()
-    try:
-        edt = datetime.fromisoformat(str(e or s).replace("Z", "+00:00"))
-        if not e: edt = edt.replace(hour=23, minute=59)
-        if edt < now: return "종료됨"
-        m = int((edt - now).total_seconds() // 60)
-        return f"남음 {m//1440}일 { (m//60)%24 }시간" if m > 60 else f"남음 {m}분"
-    except: return ""
+# 2-3) 자주 찾는 활동 write-behind: 워커마다 FAV_FLUSH_INTERVAL 초마다 모아 쓰고 다시 읽음
+fav_counter = FavCounter()
+FAV_FLUSH_SQL = "INSERT INTO favs(name, count) SELECT * FROM unnest(%s::text[], %s::int[]) ON CONFLICT(name) DO UPDATE SET count = favs.count + EXCLUDED.count"
 
-# 2) FastAPI & Auth
-app = FastAPI(redirect_slashes=False)
-def get_user_id_from_req(request: Request):
-    t = request.cookies.get(COOKIE_NAME)
-    if not t: return None
+async def fav_flush():
+    pending = fav_counter.take_pending()
     try:
-        with get_cursor() as cur:
-            cur.execute("SELECT user_id, expires_at FROM sessions WHERE token=%s", (t,))
-            row = cur.fetchone()
-            if row and datetime.fromisoformat(row[1]) > now_kst(): return row[0]
-    except: pass
-    return None
+        async with get_acursor() as cur:
+            if pending:
+                names = sorted(pending)  # 워커 간 행 잠금 순서를 맞춰 교착 방지
+                await cur.execute(FAV_FLUSH_SQL, (names, [pending[n] for n in names]))
+            await cur.execute("SELECT name, count FROM favs ORDER BY count DESC LIMIT %s", (fav_counter.capacity,))
+            rows = await cur.fetchall()
+    except Exception:
+        for n, d in pending.items(): fav_counter.pending[n] = fav_counter.pending.get(n, 0) + d  # 다음에 다시 시도
+        raise
+    fav_counter.reload(rows)
 
-LOGIN_HTML = """
-<!doctype html><html lang="ko"><head><meta charset="utf-8"/><meta name="viewport" content="width=device-width,initial-scale=1"/><title>로그인</title>
-<style>body{font-family:Pretendard,sans-serif;background:#FAF9F6;display:flex;justify-content:center;padding-top:60px;margin:0;} .card{background:#fff;border:1px solid #E5E3DD;border-radius:20px;padding:30px;width:90%;max-width:360px;box-shadow:0 10px 25px rgba(0,0,0,0.05);} h1{font-size:24px;margin-bottom:20px;text-align:center;} input{width:100%;padding:14px;border:1px solid #e5e7eb;border-radius:12px;margin-bottom:15px;box-sizing:border-box;font-size:15px;outline:none;} .btn{width:100%;padding:15px;background:#111;color:#fff;border:0;border-radius:12px;cursor:pointer;font-weight:bold;width:100%;} .err{color:red;font-size:13px;margin-bottom:10px;text-align:center;}</style></head>
-<body><div class="card"><h1>로그인</h1><form method="post" action="/login"><input name="email" type="email" placeholder="이메일" required/><input name="password" type="password" placeholder="비밀번호" required/><div class="err">__ERROR_BLOCK__</div><button class="btn">로그인</button></form><div style="text-align:center;margin-top:20px;font-size:14px;color:#888;">계정이 없으신가요? <a href="/signup" style="color:#111;text-decoration:none;font-weight:bold;">회원가입</a></div></div></body></html>
-"""
+async def fav_flush_loop():
+    while True:
+        try: await fav_flush()
+        except Exception as e: print(f"[FAVS] flush error: {e}")
+        await asyncio.sleep(FAV_FLUSH_INTERVAL)
 
-@app.get("/login")
-async def login_get(err: str = ""): return HTMLResponse(LOGIN_HTML.replace("__ERROR_BLOCK__", err))
+_fav_task = None
+@app.on_event("startup")
+async def start_fav_flush():
+    global _fav_task
+    if apool: _fav_task = asyncio.create_task(fav_flush_loop())  # 첫 실행이 DB 에서 초기 상위 목록을 읽어 옴
 
-@app.post("/login")
-async def login_post(email: str = Form(...), password: str = Form(...)):
-    try:
-        with get_cursor() as cur:
-            cur.execute("SELECT id, pw_hash FROM users WHERE email=%s", (email.strip().lower(),))
-            row = cur.fetchone()
-            if row and pw_verify(password, row[1]):
-                token = uuid.uuid4().hex
-                cur.execute("INSERT INTO sessions(token, user_id, expires_at) VALUES(%s,%s,%s)", (token, row[0], (now_kst()+timedelta(hours=SESSION_HOURS)).isoformat()))
-                resp = RedirectResponse(url="/", status_code=303)
-                resp.set_cookie(COOKIE_NAME, token, max_age=SESSION_HOURS*3600, httponly=True, samesite="lax", path="/")
-                return resp
-    except: pass
-    return RedirectResponse(url="/login?err=LoginFail", status_code=303)
+@app.on_event("shutdown")
+async def stop_fav_flush():
+    if apool and fav_counter.pending:
+        try: await fav_flush()
+        except Exception as e: print(f"[FAVS] final flush error: {e}")
 
 # (P2 회원가입 로직으로 계속...)
 # =========================================================
 # 5) Gradio 비즈니스 로직 (PostgreSQL 전용)
 # =========================================================
 
-def _get_event_counts(cur, event_ids, user_id):
-    if not event_ids: return {}, {}
-    counts = {}; joined = {}
-    # PostgreSQL ANY 연산자로 일괄 조회
-    cur.execute('SELECT event_id, COUNT(*) FROM event_participants WHERE event_id = ANY(%s) GROUP BY event_id', (list(event_ids),))
-    for eid, cnt in cur.fetchall(): counts[eid] = int(cnt)
-    if user_id:
-        cur.execute('SELECT event_id FROM event_participants WHERE user_id=%s AND event_id = ANY(%s)', (user_id, list(event_ids)))
-        for (eid,) in cur.fetchall(): joined[eid] = True
-    return counts, joined
-
-def list_active_events_logic(limit=60):
-    with get_cursor() as cur:
-        cur.execute('SELECT id,title,photo,"start","end",addr,capacity,is_unlimited FROM events ORDER BY created_at DESC LIMIT %s', (limit,))
-        rows = cur.fetchall()
-    keys = ["id","title","photo","start","end","addr","cap","unlim"]
-    events = [dict(zip(keys, r)) for r in rows]
-    return [e for e in events if is_active_event(e['end'], e['start'])]
-
-def refresh_view(req: gr.Request):
-    uid = get_user_id_from_req(req.request)
-    active_evs = list_active_events_logic(MAX_CARDS)
-    
-    with get_cursor() as cur:
-        ids = [e["id"] for e in active_evs]
-        counts, joined = _get_event_counts(cur, ids, uid)
-    
-    my_joined_id = get_joined_event_id(uid)
-    updates = []
+# 참여: 정원, 종료 여부, 1인 1활동 규칙을 한 문장에서 검사하고 카운터와 참여 행을 함께 갱신.
+# events 행의 UPDATE 잠금이 같은 활동에 대한 동시 참여를 직렬화하므로 정원을 넘지 않는다.
+# 1인 1활동 규칙은 join_event 가 먼저 잡는 사용자 잠금(JOIN_LOCK_SQL)으로 지킨다.
+JOIN_SQL = """
+WITH ev AS (
+    UPDATE events SET participant_count = participant_count + 1
+    WHERE id = %(eid)s AND "end" > now()
+      AND (is_unlimited = 1 OR participant_count < capacity)
+      AND NOT EXISTS (SELECT 1 FROM event_participants p JOIN events e2 ON e2.id = p.event_id
+                      WHERE p.user_id = %(uid)s AND e2."end" > now())
+    RETURNING id, participant_count
+)
+INSERT INTO event_participants (event_id, user_id, joined_at) SELECT id, %(uid)s, now() FROM ev RETURNING (SELECT participant_count FROM ev)
+"""
+LEAVE_SQL = """
+WITH del AS (DELETE FROM event_participants WHERE event_id = %(eid)s AND user_id = %(uid)s RETURNING event_id)
+UPDATE events SET participant_count = participant_count - 1 WHERE id IN (SELECT event_id FROM del) RETURNING participant_count
+"""
+# 같은 사용자의 참여를 직렬화하는 트랜잭션 잠금. 서로 다른 활동에 동시에 참여하면 둘 다 같은 스냅샷으로
+# NOT EXISTS 를 통과하므로, JOIN_SQL 보다 먼저 별도 문장으로 잡아야 JOIN_SQL 이 새 스냅샷에서 앞선 참여를 본다
+JOIN_LOCK_NS = 7302  # (JOIN_LOCK_NS, hashtext(uid)) 두 정수 키. 마이그레이션/청소의 bigint 키와 겹치지 않음
+JOIN_LOCK_SQL = "SELECT pg_advisory_xact_lock(%s, hashtext(%s))"
+# 둘 다 성공하면 바뀐 인원 수, 아니면 None
+async def join_event(uid, eid):
+    try:
+        async with get_acursor() as cur:
+            await cur.execute(JOIN_LOCK_SQL, (JOIN_LOCK_NS, uid), prepare=True)
+            await cur.execute(JOIN_SQL, {"eid": eid, "uid": uid}, prepare=True)
+            row = await cur.fetchone()
+            if row: await mark_write(cur, uid)
+    except psycopg.errors.UniqueViolation: return None  # 같은 활동 중복 클릭
+    if row: active_index.set_count(eid, row[0])
+    return row[0] if row else None
+async def leave_event(uid, eid):
+    async with get_acursor() as cur:
+        await cur.execute(LEAVE_SQL, {"eid": eid, "uid": uid}, prepare=True)
+        row = await cur.fetchone()
+        if row: await mark_write(cur, uid)
+    if row: active_index.set_count(eid, row[0])
+    return row[0] if row else None
+
+async def get_live_joined_ids(uid):
+    # 사용자가 참여 중인 살아있는 활동 id 집합 (refresh_view 의 사용자별 쿼리 한 번)
+    if not uid: return set()
+    async with get_acursor(readonly=True, uid=uid) as cur:
+        await cur.execute('SELECT p.event_id FROM event_participants p JOIN events e ON e.id = p.event_id WHERE p.user_id=%s AND e."end" > now()', (uid,), prepare=True)
+        return {r[0] for r in await cur.fetchall()}
+
+async def nearby_events_logic(lat, lng, radius_m=None, k=20):
+    # 위치 인덱스는 활성 활동 인덱스가 생성/삭제/종료 때마다 같이 고침 (요청 경로에서 다시 만들지 않음)
+    await active_index.ensure_fresh(); active_index.expire()
+    hits = active_index.geo.nearby(lat, lng, radius_m=radius_m, k=k)
+    if not hits: return []
+    async with get_acursor(readonly=True) as cur:
+        await cur.execute('SELECT id,title,addr,photo_hash,lat,lng,participant_count,capacity,is_unlimited FROM events WHERE id = ANY(%s) AND "end" > now()', ([eid for _, eid in hits],), prepare=True)
+        rows = {r[0]: r for r in await cur.fetchall()}
+    keys = ["id","title","addr","photo_hash","lat","lng","count","cap","unlim"]
+    return [dict(zip(keys, rows[eid]), distance_m=round(d)) for d, eid in hits if eid in rows]
+
+def card_img_html(h):
+    # 이미지는 브라우저가 /photos 에서 직접 받아 캐시 (Gradio 재인코딩 없음)
+    return f"<img src='{photo_url(h)}' loading='lazy' alt=''/>" if h else ""
+
+# 프로세스 공용 활성 활동 인덱스: created_at 역순 정렬 목록 + 종료 분(minute) 단위 타이머 휠.
+# 피드 알림(생성/삭제/인원 변경)으로 증분 갱신하고 ACTIVE_RESYNC 초마다 전체를 다시 읽어 빠진 알림을 메운다.
+# 날짜 파싱, 시작 시각/정원 표시, 이미지 태그는 활동마다 한 번만 만든다.
+def _event_capacity_label(cap, unlim):
+    # 카드의 "현재/정원" 표시. refresh_view 는 "∞" 가 아니면 정수로 다시 읽어 마감 여부를 판단
+    return "∞" if unlim else str(int(cap or 0))
+
+EVENT_COLS = 'id,title,photo_hash,"start","end",addr,capacity,is_unlimited,participant_count,created_at,lat,lng'
+class ActiveEventIndex:
+    def __init__(self):
+        self.events = {}; self.order = []; self.wheel = {}
+        self.geo = GeoIndex()  # 좌표가 있는 활성 활동만. upsert/remove 와 함께 증분 갱신
+        self.swept = 0; self.loaded_at = None; self._lock = None
+    @staticmethod
+    def _record(row):
+        eid, title, ph, start, end, addr, cap, unlim, cnt, created, lat, lng = row
+        sdt, edt = as_kst(start), as_kst(end)
+        return {"id": eid, "title": title, "photo_hash": ph, "start": sdt, "end": edt, "addr": addr, "cap": cap, "unlim": unlim,
+                "count": int(cnt or 0), "sort": (-as_kst(created).timestamp(), eid),
+                "start_label": fmt_start(sdt), "cap_label": _event_capacity_label(cap, unlim),
+                "title_md": f"### {title}", "img_html": card_img_html(ph), "lat": lat, "lng": lng}
+    def upsert(self, row):
+        r = self._record(row)
+        if r["end"] is None or r["end"] <= now_kst(): return
+        self.remove(r["id"])
+        self.events[r["id"]] = r
+        bisect.insort(self.order, r["sort"])
+        slot = int(r["end"].timestamp() // 60) + 1  # 끝난 다음 분에 휠에서 치움
+        self.wheel.setdefault(slot, set()).add(r["id"])
+        if r["lat"] is not None and r["lng"] is not None: self.geo.add(r["id"], r["lat"], r["lng"])
+    def remove(self, eid):
+        r = self.events.pop(eid, None)
+        if not r: return
+        i = bisect.bisect_left(self.order, r["sort"])
+        if i < len(self.order) and self.order[i] == r["sort"]: del self.order[i]
+        self.geo.remove(eid)
+        self.wheel.get(int(r["end"].timestamp() // 60) + 1, set()).discard(eid)
+    def set_count(self, eid, n):
+        if eid in self.events: self.events[eid]["count"] = int(n)
+    def set_photo(self, eid, h):
+        if eid in self.events: self.events[eid].update(photo_hash=h, img_html=card_img_html(h))
+    def expire(self):
+        now_min = int(time.time() // 60)
+        if now_min - self.swept > len(self.wheel): due = [m for m in self.wheel if m <= now_min]  # 오래 쉬었으면 있는 칸만
+        else: due = range(self.swept, now_min + 1)
+        for m in due:
+            for eid in self.wheel.pop(m, ()): self.remove(eid)
+        self.swept = now_min
+    async def reload(self):
+        # 전체 재동기화는 복제본에서 (ACTIVE_RESYNC 초에 한 번이라 ms 단위 복제 지연은 무시할 만함)
+        async with get_acursor(readonly=True) as cur:
+            await cur.execute(f'SELECT {EVENT_COLS} FROM events WHERE "end" > now()')
+            rows = await cur.fetchall()
+        self.events, self.order, self.wheel, self.geo = {}, [], {}, GeoIndex()
+        for row in rows: self.upsert(row)
+        self.loaded_at = time.monotonic()
+    async def ensure_fresh(self):
+        if self.loaded_at is not None and time.monotonic() - self.loaded_at < ACTIVE_RESYNC: return
+        if self._lock is None: self._lock = asyncio.Lock()
+        async with self._lock:  # 동시에 여러 요청이 들어와도 다시 읽기는 한 번
+            if self.loaded_at is None:
+                feed_hub.listeners.append(self.on_feed); feed_hub.start()
+            if self.loaded_at is None or time.monotonic() - self.loaded_at >= ACTIVE_RESYNC: await self.reload()
+    async def top(self, n):
+        await self.ensure_fresh()
+        self.expire()
+        now = now_kst(); out = []
+        for key in self.order:
+            r = self.events[key[1]]
+            if r["end"] > now: out.append(r)
+            if len(out) >= n: break
+        return out
+    def on_feed(self, payload):
+        msg = json.loads(payload)
+        if msg["op"] == "delete": self.remove(msg["id"])
+        elif msg["op"] == "count": self.set_count(msg["id"], msg["count"])
+        elif msg["op"] == "photo": self.set_photo(msg["id"], msg["photo_hash"])
+        elif msg["op"] == "create" and msg["id"] not in self.events: asyncio.create_task(self._fetch(msg["id"]))
+    async def _fetch(self, eid):
+        try:
+            async with get_acursor() as cur:
+                await cur.execute(f"SELECT {EVENT_COLS} FROM events WHERE id=%s", (eid,), prepare=True)
+                row = await cur.fetchone()
+            if row: self.upsert(row)
+        except Exception as e: print(f"[ACTIVE] fetch error: {e}")
+active_index = ActiveEventIndex()
+
+# 세션별로 마지막에 보낸 카드 상태를 기억해 두고, 바뀐 컴포넌트만 다시 보냄
+view_cache = TTLCache(int(os.getenv("VIEW_CACHE_SIZE", "5000")), 3600)  # session_hash -> [카드 상태]
+EMPTY_CARD = (False, "", "", "", "", (None, False))
+
+def _card_update(j, v):
+    # j: 0 box, 1 img, 2 title, 3 meta, 4 id_hidden, 5 button
+    if j == 0: return gr.update(visible=v)
+    if j == 5: return gr.update(value=v[0], interactive=v[1]) if v[0] else gr.update(interactive=v[1])
+    return gr.update(value=v)
+
+@timed_handler("refresh_view")
+async def refresh_view(req: gr.Request):
+    uid = await get_user_id_from_req(req.request)
+    active_evs = await active_index.top(MAX_CARDS)
+    # 공용 인덱스 위에 사용자별 정보(참여 여부)만 한 번의 쿼리로 얹음
+    my_ids = await get_live_joined_ids(uid)
+    my_joined_id = next(iter(my_ids), None)
+    states = []
     
     for i in range(MAX_CARDS):
         if i < len(active_evs):
             e = active_evs[i]; eid = e["id"]
-            cap_label = _event_capacity_label(e['cap'], e['unlim'])
-            cnt = counts.get(eid, 0)
-            is_joined = joined.get(eid, False)
+            cap_label = e["cap_label"]
+            cnt = e["count"]
+            is_joined = eid in my_ids
             
             # 버튼 상태 결정
             is_full = (cap_label != "∞" and cnt >= int(cap_label))
@@ -294,38 +1025,67 @@ def refresh_view(req: gr.Request):
             if not is_joined:
                 if is_full or (my_joined_id and my_joined_id != eid): interactive = False
 
-            updates.extend([
-                gr.update(visible=True), # card_box
-                gr.update(value=decode_photo(e["photo"])), # img
-                gr.update(value=f"### {e['title']}"), # title
-                gr.update(value=f"📍 {e['addr']}\n⏰ {fmt_start(e['start'])} · **{remain_text(e['end'], e['start'])}**\n👥 {cnt}/{cap_label}"), # meta
-                gr.update(value=eid), # id_hidden
-                gr.update(value=btn_label, interactive=interactive) # button
-            ])
+            states.append((
+                True, # card_box
+                e["img_html"], # img
+                e["title_md"], # title
+                f"📍 {e['addr']}\n⏰ {e['start_label']} · **{remain_text(e['end'], e['start'])}**\n👥 {cnt}/{cap_label}", # meta
+                eid, # id_hidden
+                (btn_label, interactive) # button
+            ))
         else:
-            updates.extend([gr.update(visible=False), None, "", "", "", gr.update(interactive=False)])
-            
+            states.append(EMPTY_CARD)
+
+    prev = view_cache.get(req.session_hash) if req.session_hash else None
+    if req.session_hash: view_cache.set(req.session_hash, states)
+    # outputs 순서(card_boxes + card_imgs + ... + card_btns)에 맞춰 컴포넌트 종류별로 나열
+    updates = []
+    for j in range(6):
+        for i, st in enumerate(states):
+            updates.append(gr.update() if prev and prev[i][j] == st[j] else _card_update(j, st[j]))
     return tuple(updates)
 
 # --- 즐겨찾기 및 장소 검색 로직 ---
-def get_favs_logic():
-    with get_cursor() as cur:
-        cur.execute("SELECT name FROM favs ORDER BY count DESC LIMIT 10")
-        return [r[0] for r in cur.fetchall()]
+async def get_favs_logic():
+    return fav_counter.top(10)
 
-def search_place_logic(keyword):
-    docs = kakao_search(keyword)
-    if not docs: return gr.update(choices=[], visible=False), "검색 결과가 없습니다."
-    choices = [f"{d['place_name']} | {d.get('road_address_name') or d.get('address_name')}" for d in docs]
-    return gr.update(choices=choices, visible=True), f"{len(choices)}건 검색됨"
+async def search_place_logic(keyword):
+    # 세 번째 값은 선택지 -> (위도, 경도). 카카오 응답의 y 가 위도, x 가 경도
+    docs = await kakao_search(keyword)
+    if not docs: return gr.update(choices=[], visible=False), "검색 결과가 없습니다.", {}
+    places = {f"{d['place_name']} | {d.get('road_address_name') or d.get('address_name')}": (float(d["y"]), float(d["x"])) for d in docs}
+    return gr.update(choices=list(places), visible=True), f"{len(places)}건 검색됨", places
 
 # =========================================================
 # 6) Gradio UI 레이아웃 (60개 카드 루프 및 모달 복구)
 # =========================================================
 
+# 피드 알림이 오면 숨은 버튼을 눌러 refresh_view 실행 (연속 알림은 300ms 로 묶음)
+CSS = """
+body,.gradio-container{background:#FAF9F6 !important;font-family:Pretendard,sans-serif;}
+.event-card{background:#fff;border:1px solid #E5E3DD;border-radius:20px;padding:14px !important;box-shadow:0 10px 25px rgba(0,0,0,0.05);}
+.event-img img{width:100%;aspect-ratio:4/3;object-fit:cover;border-radius:14px;display:block;}
+.join-btn{border-radius:12px !important;background:#111 !important;color:#fff !important;font-weight:bold;}
+.join-btn:disabled{background:#d1d5db !important;color:#6b7280 !important;}
+#fab_btn{position:fixed;right:22px;bottom:22px;width:60px;height:60px;min-width:0;border-radius:30px;background:#111;color:#fff;font-size:28px;z-index:50;box-shadow:0 8px 20px rgba(0,0,0,0.2);}
+.main-modal,.sub-modal{position:fixed;left:50%;top:50%;transform:translate(-50%,-50%);width:92%;max-width:480px;max-height:88vh;overflow-y:auto;background:#fff;border-radius:20px;padding:20px !important;z-index:100;box-shadow:0 20px 60px rgba(0,0,0,0.25);}
+.sub-modal{z-index:110;}
+.fav-grid{flex-wrap:wrap;gap:6px;}
+.fav-btn{flex:0 0 auto !important;min-width:0 !important;border-radius:999px !important;font-size:13px;}
+"""
+
+LIVE_FEED_JS = """
+() => {
+  const es = new EventSource("/feed/stream");
+  let t = null;
+  es.onmessage = () => { clearTimeout(t); t = setTimeout(() => document.querySelector("#live_refresh")?.click(), 300); };
+}
+"""
+
+_t = time.perf_counter()
 with gr.Blocks(title="오세요") as demo:
     # 💡 Gradio 6.0 대응: CSS를 HTML 내부 스타일로 직접 삽입
-    gr.HTML(f"<style>{CSS}</style>")
+    gr.HTML(f"<style>{CSS}#live_refresh{{display:none !important;}}</style>")
 
     with gr.Row():
         gr.Markdown("# 📍 지금, 오세요")
@@ -337,7 +1097,7 @@ with gr.Blocks(title="오세요") as demo:
     with gr.Row():
         for i in range(MAX_CARDS):
             with gr.Column(visible=False, elem_classes=["event-card"], min_width=320) as box:
-                c_img = gr.Image(show_label=False, interactive=False, elem_classes=["event-img"])
+                c_img = gr.HTML(elem_classes=["event-img"])
                 c_title = gr.Markdown()
                 c_meta = gr.Markdown()
                 c_hid = gr.Textbox(visible=False)
@@ -348,6 +1108,7 @@ with gr.Blocks(title="오세요") as demo:
 
     # --- FAB (더하기 버튼) ---
     fab = gr.Button("＋", elem_id="fab_btn")
+    live_btn = gr.Button("", elem_id="live_refresh")
 
     # --- 활동 만들기 메인 모달 ---
     with gr.Column(visible=False, elem_classes=["main-modal"]) as main_modal:
@@ -387,31 +1148,32 @@ with gr.Blocks(title="오세요") as demo:
         s_res = gr.Radio(label="장소를 선택해 주세요", visible=False)
         s_confirm = gr.Button("선택 완료", variant="primary")
         s_cancel = gr.Button("취소")
+        place_opts = gr.State({})  # 마지막 검색의 선택지 -> (위도, 경도)
+        new_ll = gr.State(None)  # 선택한 장소 좌표 (주소를 직접 고치면 비움)
 
     # --- 이벤트 핸들러 연결 (2,000줄 분량의 유기적 연결) ---
 
     # 1. 초기 로드
-    demo.load(refresh_view, outputs=card_boxes + card_imgs + card_titles + card_metas + card_ids + card_btns)
+    # Gradio 기본 concurrency_limit=1 이면 알림마다 모든 브라우저의 새로고침이 워커당 한 줄로 밀림.
+    # refresh_view 는 비동기이고 DB 동시성은 커넥션 풀이 제한하므로 Gradio 쪽 제한은 두지 않음
+    demo.load(refresh_view, outputs=card_boxes + card_imgs + card_titles + card_metas + card_ids + card_btns, concurrency_limit=None)
+    demo.load(None, js=LIVE_FEED_JS)
+    live_btn.click(refresh_view, outputs=card_boxes + card_imgs + card_titles + card_metas + card_ids + card_btns, concurrency_limit=None)
 
     # 2. 활동 참여/빠지기 (60개 카드 각각 연결)
-    def toggle_join_gr(eid, req: gr.Request):
-        uid = get_user_id_from_req(req.request)
-        if not uid or not eid: return refresh_view(req)
-        with get_cursor() as cur:
-            cur.execute("SELECT 1 FROM event_participants WHERE event_id=%s AND user_id=%s", (eid, uid))
-            if cur.fetchone():
-                cur.execute("DELETE FROM event_participants WHERE event_id=%s AND user_id=%s", (eid, uid))
-            else:
-                if get_joined_event_id(uid): return refresh_view(req)
-                cur.execute("INSERT INTO event_participants (event_id, user_id, joined_at) VALUES (%s, %s, %s)", (eid, uid, now_kst().isoformat()))
-        return refresh_view(req)
+    @timed_handler("toggle_join_gr")
+    async def toggle_join_gr(eid, req: gr.Request):
+        uid = await get_user_id_from_req(req.request)
+        if not uid or not eid: return await refresh_view(req)
+        if await leave_event(uid, eid) is None: await join_event(uid, eid)
+        return await refresh_view(req)
 
     for i in range(MAX_CARDS):
-        card_btns[i].click(toggle_join_gr, inputs=[card_ids[i]], outputs=card_boxes + card_imgs + card_titles + card_metas + card_ids + card_btns)
+        card_btns[i].click(toggle_join_gr, inputs=[card_ids[i]], outputs=card_boxes + card_imgs + card_titles + card_metas + card_ids + card_btns, concurrency_limit=None)
 
     # 3. 메인 모달 제어
-    def open_main_gr():
-        favs = get_favs_logic()
+    async def open_main_gr():
+        favs = await get_favs_logic()
         f_updates = []
         for i in range(10):
             if i < len(favs): f_updates.append(gr.update(value=f"⭐ {favs[i]}", visible=True))
@@ -427,25 +1189,32 @@ with gr.Blocks(title="오세요") as demo:
 
     # 5. 장소 검색 모달 제어
     open_search.click(lambda: gr.update(visible=True), outputs=place_modal)
-    s_btn.click(search_place_logic, inputs=s_kw, outputs=[s_res, s_kw]) # 검색어 가이드로 결과 표시
-    s_confirm.click(lambda v: (v.split(" | ")[1] if "|" in v else v, gr.update(visible=False)), inputs=s_res, outputs=[new_a, place_modal])
+    s_btn.click(search_place_logic, inputs=s_kw, outputs=[s_res, s_kw, place_opts]) # 검색어 가이드로 결과 표시
+    s_confirm.click(lambda v, opts: (v.split(" | ")[1] if "|" in v else v, gr.update(visible=False), opts.get(v)), inputs=[s_res, place_opts], outputs=[new_a, place_modal, new_ll])
+    new_a.input(lambda: None, outputs=new_ll)
     s_cancel.click(lambda: gr.update(visible=False), outputs=place_modal)
 
     # 6. 활동 저장
-    def save_event_gr(title, img, addr, cap, unlim, req: gr.Request):
-        uid = get_user_id_from_req(req.request)
+    @timed_handler("save_event_gr")
+    async def save_event_gr(title, img, addr, cap, unlim, ll, req: gr.Request):
+        uid = await get_user_id_from_req(req.request)
         if not title or not addr: return gr.update(visible=True)
         
-        photo_b64 = encode_img_to_b64(img)
+        if photo_too_large(img): gr.Warning("사진이 너무 커서 제외했어요."); img = None
         eid = uuid.uuid4().hex
-        with get_cursor() as cur:
-            cur.execute('INSERT INTO events (id,title,photo,"start","end",addr,lat,lng,created_at,user_id,capacity,is_unlimited) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)',
-                        (eid, title, photo_b64, now_kst().isoformat(), (now_kst()+timedelta(hours=2)).isoformat(), addr, 36.019, 129.343, now_kst().isoformat(), uid, int(cap), 1 if unlim else 0))
-            cur.execute("INSERT INTO favs(name, count) VALUES(%s, 1) ON CONFLICT(name) DO UPDATE SET count = favs.count + 1", (title.strip(),))
+        lat, lng = ll or (None, None)
+        async with get_acursor() as cur:
+            await cur.execute(f'INSERT INTO events (id,title,photo_hash,"start","end",addr,lat,lng,created_at,user_id,capacity,is_unlimited) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s) RETURNING {EVENT_COLS}',
+                        (eid, title, None, now_kst(), now_kst()+timedelta(hours=2), addr, lat, lng, now_kst(), uid, int(cap), 1 if unlim else 0))
+            row = await cur.fetchone()
+            await mark_write(cur, uid)
+        active_index.upsert(row)  # 만든 사람에게는 알림을 기다리지 않고 바로 보임
+        attach_photo_later(eid, img)  # 사진은 인코딩이 끝나는 대로 카드에 붙음 (저장 응답은 기다리지 않음)
+        fav_counter.incr(title.strip())  # favs 테이블에는 fav_flush 가 모아서 반영
         return gr.update(visible=False)
 
-    save_btn.click(save_event_gr, [new_t, new_img, new_a, new_cp, new_un], main_modal).then(
-        refresh_view, outputs=card_boxes + card_imgs + card_titles + card_metas + card_ids + card_btns
+    save_btn.click(save_event_gr, [new_t, new_img, new_a, new_cp, new_un, new_ll], main_modal).then(
+        refresh_view, outputs=card_boxes + card_imgs + card_titles + card_metas + card_ids + card_btns, concurrency_limit=None
     )
 
 # =========================================================
@@ -454,7 +1223,7 @@ with gr.Blocks(title="오세요") as demo:
 
 @app.get("/")
 async def pwa_shell(request: Request):
-    if not get_user_id_from_req(request):
+    if not await get_user_id_from_req(request):
         return RedirectResponse(url="/login", status_code=303)
     
     return HTMLResponse(f"""
@@ -480,14 +1249,148 @@ async def get_manifest(): return FileResponse("static/manifest.webmanifest" if o
 @app.get("/sw.js")
 async def get_sw(): return FileResponse("static/sw.js")
 
+# 활동 목록 JSON API: (created_at, id) 키셋 페이지네이션 + 약한 ETag
+API_PAGE_MAX = 100
+def _encode_cursor(created, eid): return base64.urlsafe_b64encode(f"{created.isoformat()}|{eid}".encode()).decode().rstrip("=")
+def _decode_cursor(c):
+    try:
+        created, eid = base64.urlsafe_b64decode(c + "=" * (-len(c) % 4)).decode().split("|", 1)
+        return datetime.fromisoformat(created), eid
+    except Exception: return None
+
+def event_json(r):
+    eid, title, ph, start, end, addr, lat, lng, cap, unlim, cnt = r[:11]
+    return {"id": eid, "title": title, "addr": addr, "start": as_kst(start).isoformat() if start else None,
+            "end": as_kst(end).isoformat() if end else None, "lat": lat, "lng": lng, "count": cnt,
+            "capacity": None if unlim else cap, "photo": {"thumb": photo_url(ph, "thumb"), "full": photo_url(ph, "full")} if ph else None}
+
+@app.get("/api/events")
+async def api_events(request: Request, limit: int = 20, cursor: str = ""):
+    uid = await get_user_id_from_req(request)
+    if not uid: return JSONResponse({"error": "login required"}, status_code=401)
+    limit = max(1, min(limit, API_PAGE_MAX))
+    after = _decode_cursor(cursor) if cursor else None
+    if cursor and not after: return JSONResponse({"error": "bad cursor"}, status_code=400)
+    sql = 'SELECT id,title,photo_hash,"start","end",addr,lat,lng,capacity,is_unlimited,participant_count,created_at FROM events WHERE "end" > now()'
+    params = []
+    if after:
+        sql += " AND (created_at, id) < (%s, %s)"; params += list(after)
+    sql += " ORDER BY created_at DESC, id DESC LIMIT %s"; params.append(limit + 1)
+    async with get_acursor(readonly=True, uid=uid) as cur:
+        await cur.execute(sql, params, prepare=True)
+        rows = await cur.fetchall()
+    page = rows[:limit]
+    body = json.dumps({"events": [event_json(r) for r in page],
+                       "next": _encode_cursor(page[-1][11], page[-1][0]) if len(rows) > limit else None},
+                      ensure_ascii=False, separators=(",", ":")).encode()
+    etag = f'W/"{hashlib.sha1(body).hexdigest()[:20]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    inm = request.headers.get("if-none-match", "")
+    if inm.strip() == "*" or etag in [t.strip() for t in inm.split(",")]: return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.get("/api/events/nearby")
+async def api_events_nearby(request: Request, lat: float, lng: float, radius_m: float | None = None, k: int = 20):
+    if not await get_user_id_from_req(request): return JSONResponse({"error": "login required"}, status_code=401)
+    k = max(1, min(k, 100))
+    evs = await nearby_events_logic(lat, lng, radius_m=radius_m, k=k)
+    for e in evs: e["photo_url"] = photo_url(e.pop("photo_hash"))
+    return JSONResponse({"events": evs})
+
+@app.get("/photos/{h}")
+async def get_photo(h: str, request: Request, v: str = "thumb"):
+    import imaging
+    if v not in imaging.SIZES or not re.fullmatch(r"[0-9a-f]{32}", h): return Response(status_code=404)
+    # Accept 헤더로 포맷 협상: AVIF > WebP > JPEG(예전 사진은 JPEG 만 있음)
+    accept = request.headers.get("accept", "")
+    prefs = [v + ".avif"] * ("image/avif" in accept) + [v + ".webp"] * ("image/webp" in accept) + [v]
+    found = await load_photo(h, prefs)
+    if not found: return Response(status_code=404)
+    etag = f'"{h}.{found[0]}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable", "Vary": "Accept"}
+    if request.headers.get("if-none-match") == etag: return Response(status_code=304, headers=headers)
+    return Response(content=found[2], media_type=found[1], headers=headers)
+
 @app.get("/icons/{p:path}")
 async def get_icons(p: str): return FileResponse(f"static/icons/{p}")
 
+# 계측: 라우트별 지연(경로 템플릿 기준이라 라벨 수가 늘지 않음)과 /metrics
+# Mount 는 scope["route"] 를 남기지 않아 /app 아래 요청에 Gradio 내부 경로(/, /config ...)가 찍히므로 /app 하나로 묶음
+GRADIO_PATH = "/app"
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    t0 = time.perf_counter(); status = 500
+    path = request.url.path  # 마운트된 앱이 scope 를 고치기 전에 읽어 둠
+    try:
+        resp = await call_next(request); status = resp.status_code
+        return resp
+    finally:
+        if path == GRADIO_PATH or path.startswith(GRADIO_PATH + "/"): route = GRADIO_PATH
+        else: route = getattr(request.scope.get("route"), "path", "unmatched")
+        HTTP_LATENCY.observe(time.perf_counter() - t0, request.method, route, status)
+
+def _gauges():
+    # (이름, 도움말, 값, 타입) — 다른 모듈 상태를 수집 시점에 읽음. 계속 늘기만 하는 값은 counter
+    pool = db_pool_stats(); sc = session_cache.stats(); hp = hash_pool_stats()
+    g = [("oseyo_db_pool_size", "Open connections in the async pool", pool.get("size", 0)),
+         ("oseyo_db_pool_in_use", "Connections currently checked out", pool.get("in_use", 0)),
+         ("oseyo_db_pool_waiters", "Requests waiting for a connection", pool.get("waiters", 0)),
+         ("oseyo_db_pool_max", "Async pool max size", DB_POOL_MAX),
+         ("oseyo_db_replica_pool_size", "Open connections across replica pools", sum(p.get_stats().get("pool_size", 0) for p in rpools)),
+         ("oseyo_db_replicas_down", "Replicas currently skipped after a failure", len(replica_down)),
+         ("oseyo_session_cache_size", "Session cache entries", sc["size"]),
+         ("oseyo_hash_inflight", "Password hashes running or queued", hp["inflight"]),
+         ("oseyo_feed_subscribers", "Connected SSE clients", len(feed_hub.subs)),
+         ("oseyo_active_events", "Events in the active index", len(active_index.events)),
+         ("oseyo_fav_pending", "Favourite increments not yet flushed", len(fav_counter.pending)),
+         ("oseyo_janitor_leader", "1 if this worker holds the janitor lock", int(janitor_stats["leader"])),
+         ("oseyo_kakao_breaker_state", "Kakao breaker state (0 closed, 1 half-open, 2 open)", {"closed": 0, "half_open": 1, "open": 2}[kakao_breaker.state])]
+    g += [(f"oseyo_boot_{k}_seconds", f"Startup phase {k}", round(v, 4)) for k, v in BOOT.items()]
+    g = [x + ("gauge",) for x in g]
+    c = [("oseyo_session_cache_hits_total", "Session cache hits", sc["hits"]),
+         ("oseyo_session_cache_misses_total", "Session cache misses", sc["misses"]),
+         ("oseyo_feed_notifications_total", "NOTIFY payloads received", feed_hub.received),
+         ("oseyo_janitor_runs_total", "Janitor runs completed by this worker", janitor_stats["runs"]),
+         ("oseyo_db_replica_fallbacks_total", "Replica reads retried on the primary", replica_stats["fallbacks"])]
+    c += [(f"oseyo_kakao_{k}_total", f"Kakao search {k}", v) for k, v in kakao_stats.items()]
+    return g + [x + ("counter",) for x in c]
+
+@app.get("/metrics")
+async def metrics(request: Request):
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}": return Response(status_code=401)
+    lines = []
+    for m in METRICS: lines += m.render()
+    for name, help, v, kind in _gauges(): lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {v}"]
+    return Response("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
+# 워커별 DB 예열: 비동기 풀을 열고 활성 활동 인덱스를 채워 첫 요청이 기다리지 않게 함
+@app.on_event("startup")
+async def warm_db():
+    if not apool: return
+    t0 = time.perf_counter()
+    try:
+        if apool.closed: await apool.open(wait=True, timeout=10)
+        for p in rpools:
+            # 복제본이 죽어 있어도 워커는 뜨고 읽기는 primary 로. open(wait=True) 는 실패하면 풀을 닫아 버리므로
+            # 기다리지 않고 열어 두고(백그라운드에서 계속 재연결) 짧게 한 번 받아 봄
+            if p.closed: await p.open()
+            try:
+                async with p.connection(timeout=REPLICA_ACQUIRE_TIMEOUT): pass
+            except psycopg.OperationalError as e: replica_failed(p, e)
+        if rpools: feed_hub.start()  # 다른 워커의 쓰기 알림(RYW_CHANNEL)을 처음부터 받아야 함
+        await active_index.ensure_fresh()
+    except Exception as e: log_error("warmup", e)
+    BOOT["db_warmup"] = time.perf_counter() - t0
+    print(f"[BOOT] pid={os.getpid()} db_warmup={BOOT['db_warmup']:.2f}s", flush=True)
+
 # Gradio 마운트 (반드시 /app/ 경로로)
-app = gr.mount_gradio_app(app, demo, path="/app")
+app = gr.mount_gradio_app(app, demo, path=GRADIO_PATH)
+BOOT["build"] = time.perf_counter() - _t
+print(f"[BOOT] pid={os.getpid()} " + " ".join(f"{k}={v:.2f}s" for k, v in BOOT.items()) + f" total={time.perf_counter() - _boot_t0:.2f}s", flush=True)
 
 if os.path.exists("static"):
     app.mount("/static", StaticFiles(directory="static"), name="static")
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", 8000)))
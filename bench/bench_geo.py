@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# GeoIndex 반경/k-최근접 검색 지연 측정: python bench/bench_geo.py [--sizes 10000,100000,1000000]
+import os, sys, time, random, argparse, statistics
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from geo import GeoIndex
+
+BBOX = (33.1, 38.6, 125.9, 129.6)  # 대략 남한 영역 (위도 min/max, 경도 min/max)
+
+def build(n, rnd):
+    idx = GeoIndex()
+    for i in range(n): idx.add(i, rnd.uniform(BBOX[0], BBOX[1]), rnd.uniform(BBOX[2], BBOX[3]))
+    return idx
+
+def timed(fn, queries):
+    ms = []
+    for q in queries:
+        t0 = time.perf_counter(); fn(*q); ms.append((time.perf_counter() - t0) * 1000)
+    ms.sort()
+    return statistics.mean(ms), ms[int(len(ms) * 0.95) - 1]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="10000,100000,1000000")
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--radius", type=float, default=2000)
+    ap.add_argument("--k", type=int, default=20)
+    args = ap.parse_args()
+    rnd = random.Random(42)
+    # build_s 는 기동/재동기화 때 한 번 드는 비용, update 는 생성·삭제 알림마다 드는 증분 비용(add+remove 한 쌍)
+    print(f"{'events':>9} {'build_s':>8} {'update us':>10} {'radius avg/p95 ms':>20} {'knn avg/p95 ms':>18}")
+    for n in [int(x) for x in args.sizes.split(",")]:
+        t0 = time.perf_counter(); idx = build(n, rnd); build_s = time.perf_counter() - t0
+        moves = [(n + i, rnd.uniform(BBOX[0], BBOX[1]), rnd.uniform(BBOX[2], BBOX[3])) for i in range(args.queries)]
+        t0 = time.perf_counter()
+        for eid, la, ln in moves: idx.add(eid, la, ln); idx.remove(eid)
+        upd_us = (time.perf_counter() - t0) / len(moves) * 1e6
+        qs = [(rnd.uniform(BBOX[0], BBOX[1]), rnd.uniform(BBOX[2], BBOX[3])) for _ in range(args.queries)]
+        ra = timed(lambda la, ln: idx.nearby(la, ln, radius_m=args.radius), qs)
+        ka = timed(lambda la, ln: idx.nearby(la, ln, k=args.k), qs)
+        print(f"{n:>9} {build_s:>8.2f} {upd_us:>10.1f} {ra[0]:>9.3f}/{ra[1]:<10.3f} {ka[0]:>8.3f}/{ka[1]:<9.3f}")
+
+if __name__ == "__main__":
+    main()
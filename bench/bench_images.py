@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+# 업로드 1건당 저장 바이트와 인코딩 시간: 예전 방식(JPEG q80 을 base64 로 events.photo 에 저장) vs imaging.process_upload
+#   python bench/bench_images.py --sizes 4032x3024,1920x1080 --repeat 3
+import os, io, sys, time, base64, argparse
+import numpy as np
+from PIL import Image
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import imaging  # app 은 import 하지 않음 (DB 연결/마이그레이션 없이 돌도록)
+
+def legacy_b64(img_np):
+    # 예전 app.encode_img_to_b64 와 같은 인코딩
+    buf = io.BytesIO()
+    Image.fromarray(img_np.astype("uint8")).convert("RGB").save(buf, format="JPEG", quality=80)
+    return base64.b64encode(buf.getvalue()).decode("utf-8")
+
+def synthetic_photo(w, h, seed=0):
+    # 그라데이션 + 잡음: 단색 이미지보다 실제 사진에 가까운 압축률
+    rnd = np.random.default_rng(seed)
+    y, x = np.mgrid[0:h, 0:w]
+    base = np.stack([(x * 255 // w), (y * 255 // h), ((x + y) * 127 // (w + h))], axis=-1)
+    return np.clip(base + rnd.normal(0, 18, (h, w, 3)), 0, 255).astype("uint8")
+
+def best_of(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter(); out = fn(); dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return out, best * 1000
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="4032x3024,1920x1080,800x600")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+    print(f"AVIF: {'on' if imaging.avif_supported() else 'off'}")
+    for spec in args.sizes.split(","):
+        w, h = map(int, spec.split("x")); arr = synthetic_photo(w, h)
+        b64, old_ms = best_of(lambda: legacy_b64(arr), args.repeat)
+        (_, variants), new_ms = best_of(lambda: imaging.process_upload(arr), args.repeat)
+        stored = sum(len(d) for _, _, d in variants)
+        print(f"\n{spec}: legacy base64 JPEG {len(b64) / 1024:.0f} KiB in {old_ms:.0f} ms | pipeline {stored / 1024:.0f} KiB total in {new_ms:.0f} ms")
+        for v, mime, d in variants: print(f"  {v:<12} {mime:<11} {len(d) / 1024:8.1f} KiB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# 장소 검색 캐시/합치기 효과 측정 (가짜 카카오 서버 사용, 네트워크 불필요)
+#   python bench/bench_kakao.py --searches 2000 --concurrency 50 --latency-ms 80
+import os, sys, time, random, asyncio, argparse, statistics
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fake_kakao import start
+
+HOT = ["영일대", "포항역", "죽도시장", "영일대 해수욕장", "환호공원", "송도해수욕장"]
+
+async def run(args, app):
+    rnd = random.Random(7)
+    # 80% 는 인기 검색어, 나머지는 롱테일 (공백/대소문자 변형 포함)
+    kws = [rnd.choice(HOT) + (" " if rnd.random() < 0.2 else "") if rnd.random() < 0.8 else f"카페 {rnd.randint(1, 500)}" for _ in range(args.searches)]
+    sem = asyncio.Semaphore(args.concurrency); lat = []
+    async def one(kw):
+        async with sem:
+            t0 = time.perf_counter(); await app.kakao_search(kw); lat.append((time.perf_counter() - t0) * 1000)
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(k) for k in kws))
+    return time.perf_counter() - t0, sorted(lat)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--searches", type=int, default=2000)
+    ap.add_argument("--concurrency", type=int, default=50)
+    ap.add_argument("--latency-ms", type=int, default=80)
+    args = ap.parse_args()
+    srv, base = start(latency_ms=args.latency_ms)
+    os.environ["KAKAO_API_BASE"] = base; os.environ.setdefault("KAKAO_REST_API_KEY", "bench")
+    import app
+    wall, lat = asyncio.run(run(args, app))
+    print(f"searches={args.searches} wall={wall:.2f}s rps={args.searches / wall:.0f}")
+    print(f"latency ms p50={lat[len(lat) // 2]:.2f} p95={lat[int(len(lat) * .95) - 1]:.2f} mean={statistics.mean(lat):.2f}")
+    print(f"upstream requests={srv.requests} stats={app.kakao_stats} cache={app.kakao_cache.stats()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# 읽기 복제본 라우팅 효과 측정: 같은 부하를 primary 만 / primary+replica 로 두 번 돌리고
+# primary 의 pg_stat_database 증가량(트랜잭션, 읽은 튜플, 블록)과 앱의 primary 커넥션 획득 수를
+# 처리한 작업 수로 나눠 비교한다. 사용자는 --think-ms 만큼 쉬어 가며 조작한다(쉬지 않으면 계속 쓰기를 하므로
+# read-your-writes 보호로 거의 모든 읽기가 primary 에 남는다).
+#   docker compose -f bench/replica/docker-compose.yml up -d
+#   DATABASE_URL=postgresql://postgres:pw@localhost:5432/postgres \
+#   REPLICA_URL=postgresql://postgres:pw@localhost:5433/postgres python bench/bench_replica.py --users 50 --seconds 20
+import os, sys, json, time, argparse, subprocess, tempfile
+import psycopg
+from common import ROOT, write_results
+
+STAT_SQL = "SELECT xact_commit + xact_rollback, tup_returned + tup_fetched, blks_hit + blks_read FROM pg_stat_database WHERE datname = current_database()"
+
+def vacuum(url):
+    # 앞 실행의 쓰기로 생긴 autovacuum 스캔이 다음 측정 구간에 섞이지 않게 미리 정리
+    with psycopg.connect(url, autocommit=True) as conn: conn.execute("VACUUM ANALYZE")
+
+def primary_stats(url):
+    with psycopg.connect(url, autocommit=True) as conn:
+        time.sleep(1.5)  # 다른 백엔드의 통계가 pg_stat 에 반영될 때까지
+        conn.execute("SELECT pg_stat_clear_snapshot()")
+        x, t, b = conn.execute(STAT_SQL).fetchone()
+    return {"xacts": x, "tuples": t, "blocks": b}
+
+def run_mode(name, extra_env, args, url):
+    env = {**os.environ, **extra_env}
+    if not extra_env: env.pop("DATABASE_REPLICA_URL", None)
+    out = os.path.join(tempfile.mkdtemp(), f"{name}.json")
+    vacuum(url); before = primary_stats(url)
+    subprocess.run([sys.executable, os.path.join(ROOT, "bench", "loadtest.py"), "--no-seed", "--storm-users", "0",
+                    "--users", str(args.users), "--seconds", str(args.seconds), "--think-ms", str(args.think_ms), "--out", out], env=env, check=True)
+    after = primary_stats(url)
+    res = json.load(open(out, encoding="utf-8"))
+    ops = sum(s["count"] for s in res["ops"].values())
+    delta = {k: after[k] - before[k] for k in after}
+    delta["acquires"] = res.get("db_acquires", {}).get("primary", 0)  # 앱이 primary 에서 잡은 커넥션 수
+    return {"total_rps": res["total_rps"], "ops": ops, "db_acquires": res.get("db_acquires", {}),
+            "p95_ms": {op: s["p95_ms"] for op, s in res["ops"].items()},
+            "primary": delta, "primary_per_op": {k: round(v / ops, 3) if ops else 0.0 for k, v in delta.items()}}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=50)
+    ap.add_argument("--seconds", type=float, default=20)
+    ap.add_argument("--think-ms", type=float, default=500, help="사용자별 작업 사이 평균 대기(ms)")
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args()
+    url, replica = os.getenv("DATABASE_URL"), os.getenv("REPLICA_URL")
+    if not (url and replica): sys.exit("DATABASE_URL(primary) 와 REPLICA_URL 이 필요합니다")
+    subprocess.run([sys.executable, os.path.join(ROOT, "bench", "seed.py"), "--users", str(max(500, args.users))], check=True)
+    modes = {"primary_only": run_mode("primary_only", {}, args, url),
+             "with_replica": run_mode("with_replica", {"DATABASE_REPLICA_URL": replica}, args, url)}
+    a, b = modes["primary_only"]["primary_per_op"], modes["with_replica"]["primary_per_op"]
+    reduction = {k: round((1 - b[k] / a[k]) * 100, 1) if a[k] else 0.0 for k in a}
+    for name, m in modes.items(): print(f"{name:<13} rps={m['total_rps']} acquires={m['db_acquires']} primary/op={m['primary_per_op']}")
+    print(f"primary load reduction per op (%): {reduction}")
+    print("saved", write_results("replica", {"args": vars(args), "modes": modes, "primary_reduction_pct": reduction}, args.out))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# 실시간 피드 점검 (로컬 Postgres 필요): 참여를 커밋하면
+#   1) events 트리거의 NOTIFY 가 FeedHub 구독 큐에 {"op": "count", ...} 로 도착하고
+#   2) 같은 알림이 /feed/stream SSE 로 브라우저(여기서는 httpx)에게 전달되는지 확인한다.
+#   DATABASE_URL=postgresql://postgres:pw@localhost/postgres python bench/check_feed.py
+import os, sys, json, uuid, socket, asyncio
+import httpx
+from common import ROOT  # noqa: F401  (sys.path 설정)
+
+TIMEOUT = 5  # 초
+
+def free_port():
+    with socket.socket() as s: s.bind(("127.0.0.1", 0)); return s.getsockname()[1]
+
+async def wait_for(q, pred):
+    async def loop():
+        while True:
+            msg = json.loads(await q.get())
+            if pred(msg): return msg
+    return await asyncio.wait_for(loop(), TIMEOUT)
+
+async def run(app):
+    import uvicorn
+    uid, eid, token = "bench-feed-u", "bench-feed-e", uuid.uuid4().hex
+    async with app.get_acursor() as cur:
+        await cur.execute("DELETE FROM event_participants WHERE user_id=%s OR event_id=%s", (uid, eid))
+        await cur.execute("DELETE FROM events WHERE id=%s", (eid,))
+        await cur.execute("DELETE FROM users WHERE id=%s", (uid,))
+        await cur.execute("INSERT INTO users (id, email, name) VALUES (%s,%s,%s)", (uid, "bench-feed@example.com", "피드"))
+        await cur.execute("INSERT INTO sessions (token, user_id, expires_at) VALUES (%s,%s,now()+interval '1 hour')", (token, uid))
+
+    # SSE 는 실제 서버로 받아야 스트림이 흘러나오므로 같은 루프에서 uvicorn 을 띄움
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app.app, host="127.0.0.1", port=port, log_level="warning"))
+    serve = asyncio.create_task(server.serve())
+    while not server.started: await asyncio.sleep(0.05)
+
+    results = {}
+    q = app.feed_hub.subscribe()
+    sse_lines = asyncio.Queue()
+    async def read_sse():
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", cookies={app.COOKIE_NAME: token}, timeout=None) as c:
+            async with c.stream("GET", "/feed/stream") as r:
+                results["sse_status"] = r.status_code
+                async for line in r.aiter_lines():
+                    if line.startswith("data: "): await sse_lines.put(line[6:])
+    reader = asyncio.create_task(read_sse())
+    await asyncio.sleep(1.0)  # LISTEN 연결과 SSE 구독이 자리 잡을 때까지
+    try:
+        async with app.get_acursor() as cur:
+            await cur.execute('INSERT INTO events (id,title,"start","end",addr,created_at,user_id,capacity,is_unlimited) VALUES (%s,%s,now(),now()+interval \'1 hour\',%s,now(),%s,10,0)',
+                              (eid, "피드 점검", "포항시 벤치로 0", uid))
+        results["create"] = await wait_for(q, lambda m: m.get("id") == eid and m.get("op") == "create")
+        count = await app.join_event(uid, eid)
+        results["join_count"] = count
+        results["queue"] = await wait_for(q, lambda m: m.get("id") == eid and m.get("op") == "count")
+        results["sse"] = await wait_for(sse_lines, lambda m: m.get("id") == eid and m.get("op") == "count")
+    finally:
+        app.feed_hub.unsubscribe(q)
+        reader.cancel(); server.should_exit = True; await serve
+        async with app.get_acursor() as cur:
+            await cur.execute("DELETE FROM event_participants WHERE event_id=%s", (eid,))
+            await cur.execute("DELETE FROM events WHERE id=%s", (eid,))
+            await cur.execute("DELETE FROM sessions WHERE token=%s", (token,))
+            await cur.execute("DELETE FROM users WHERE id=%s", (uid,))
+    ok = results.get("sse_status") == 200 and results["queue"].get("count") == count == 1 and results["sse"] == results["queue"]
+    return ok, results
+
+def main():
+    if not os.getenv("DATABASE_URL"): sys.exit("DATABASE_URL 이 필요합니다 (로컬 Postgres)")
+    import app
+    try: ok, results = asyncio.run(run(app))
+    except asyncio.TimeoutError: ok, results = False, {"error": f"{TIMEOUT}s 안에 알림이 오지 않음"}
+    print(json.dumps(results, ensure_ascii=False, default=str))
+    print("feed check", "OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+# 벤치 공용: 백분위 요약, 결과 JSON 저장/비교, Gradio 핸들러에 넘길 가짜 gr.Request
+import os, sys, json, time, platform, subprocess
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "bench", "results")
+if ROOT not in sys.path: sys.path.insert(0, ROOT)
+
+def pct(sorted_vals, p):
+    if not sorted_vals: return 0.0
+    return sorted_vals[min(len(sorted_vals) - 1, max(0, int(round(p / 100 * len(sorted_vals))) - 1))]
+
+def summarize(samples_s, wall_s, errors=0):
+    ms = sorted(v * 1000 for v in samples_s)
+    return {"count": len(ms), "errors": errors, "rps": round(len(ms) / wall_s, 2) if wall_s else 0.0,
+            "mean_ms": round(sum(ms) / len(ms), 3) if ms else 0.0,
+            "p50_ms": round(pct(ms, 50), 3), "p95_ms": round(pct(ms, 95), 3), "p99_ms": round(pct(ms, 99), 3)}
+
+def git_rev():
+    try: return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception: return "unknown"
+
+def write_results(kind, payload, path=None):
+    # bench/results/<kind>-<커밋>-<시각>.json 에 저장하고 경로 반환
+    payload = {"meta": {"kind": kind, "git": git_rev(), "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                        "python": platform.python_version(), "machine": platform.machine()}, **payload}
+    if not path:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{kind}-{payload['meta']['git']}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w", encoding="utf-8") as f: json.dump(payload, f, ensure_ascii=False, indent=2)
+    return path
+
+def compare(a_path, b_path):
+    # 두 결과 파일의 작업별 처리량/p95 차이 출력 (a = 기준)
+    a, b = (json.load(open(p, encoding="utf-8")) for p in (a_path, b_path))
+    print(f"{'op':<18} {'rps a':>9} {'rps b':>9} {'p95 a':>9} {'p95 b':>9} {'p95 Δ':>8}")
+    for op in sorted(set(a.get("ops", {})) | set(b.get("ops", {}))):
+        x, y = a.get("ops", {}).get(op, {}), b.get("ops", {}).get(op, {})
+        d = (y.get("p95_ms", 0) - x.get("p95_ms", 0)) / x["p95_ms"] * 100 if x.get("p95_ms") else 0.0
+        print(f"{op:<18} {x.get('rps', 0):>9} {y.get('rps', 0):>9} {x.get('p95_ms', 0):>9} {y.get('p95_ms', 0):>9} {d:>7.1f}%")
+
+def fake_gr_request(token, session_hash, cookie_name):
+    # refresh_view 등은 req.request.cookies 와 req.session_hash 만 사용
+    return SimpleNamespace(request=SimpleNamespace(cookies={cookie_name: token} if token else {}), session_hash=session_hash)
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+# 오프라인 테스트/벤치용 가짜 카카오 로컬 API.
+#   python bench/fake_kakao.py --port 8765 --latency-ms 80
+#   KAKAO_API_BASE=http://127.0.0.1:8765 uvicorn app:app
+import json, time, hashlib, argparse, threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+def fake_documents(query, size=15):
+    # 검색어마다 항상 같은 결과 (좌표는 포항 근처에 흩뿌림)
+    seed = int(hashlib.md5(query.encode()).hexdigest()[:8], 16)
+    docs = []
+    for i in range(min(size, 3 + seed % 13)):
+        docs.append({"place_name": f"{query} {i + 1}호점", "road_address_name": f"경북 포항시 북구 가상로 {seed % 500 + i}",
+                     "address_name": f"경북 포항시 북구 가상동 {i + 1}", "y": f"{36.0 + (seed % 1000) / 10000 + i * 0.001:.6f}",
+                     "x": f"{129.3 + (seed % 777) / 10000 + i * 0.001:.6f}"})
+    return docs
+
+class FakeKakaoServer(ThreadingHTTPServer):
+    daemon_threads = True
+    def __init__(self, addr, latency_ms=0, fail_rate=0.0):
+        super().__init__(addr, _Handler)
+        self.latency_ms, self.fail_rate = latency_ms, fail_rate
+        self.requests = 0; self._lock = threading.Lock()
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *a): pass
+    def do_GET(self):
+        srv = self.server
+        with srv._lock: srv.requests += 1; n = srv.requests
+        u = urlparse(self.path)
+        if u.path != "/v2/local/search/keyword.json" or not self.headers.get("Authorization", "").startswith("KakaoAK"):
+            self.send_response(404); self.end_headers(); return
+        if srv.latency_ms: time.sleep(srv.latency_ms / 1000)
+        if srv.fail_rate and (n * 2654435761 % 1000) / 1000 < srv.fail_rate:
+            self.send_response(503); self.end_headers(); return
+        q = parse_qs(u.query)
+        body = json.dumps({"documents": fake_documents(q.get("query", [""])[0], int(q.get("size", ["15"])[0]))}, ensure_ascii=False).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers(); self.wfile.write(body)
+
+def start(port=0, latency_ms=0, fail_rate=0.0):
+    # 백그라운드 스레드로 띄우고 (서버, base_url) 반환. port=0 이면 빈 포트 사용
+    srv = FakeKakaoServer(("127.0.0.1", port), latency_ms, fail_rate)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, f"http://127.0.0.1:{srv.server_address[1]}"
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency-ms", type=int, default=80)
+    ap.add_argument("--fail-rate", type=float, default=0.0)
+    args = ap.parse_args()
+    srv = FakeKakaoServer(("127.0.0.1", args.port), args.latency_ms, args.fail_rate)
+    print(f"fake kakao on http://127.0.0.1:{args.port}")
+    srv.serve_forever()
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+# 동시 사용자 부하 테스트: 로그인 -> PWA 쉘 / 카드 새로고침 / 참여 토글 / 활동 저장 / 장소 검색 / API 목록을 섞어 반복.
+# 실제 Postgres(로컬)와 가짜 카카오 서버를 쓰고, 앱은 같은 프로세스에서 ASGI 로 직접 호출한다 (포트 불필요).
+#   DATABASE_URL=postgresql://postgres:pw@localhost/postgres python bench/loadtest.py --users 100 --seconds 30
+#   python bench/loadtest.py compare bench/results/load-aaa.json bench/results/load-bbb.json
+# 정원 동시성 검사(join storm)와 같은 사용자의 다른 활동 동시 참여 검사(join race)는 기본으로 같이 돌고,
+# 결과 JSON 의 "joinstorm", "joinrace" 에 기록된다.
+import os, sys, time, random, asyncio, argparse
+from collections import defaultdict
+from common import summarize, write_results, compare, fake_gr_request
+from fake_kakao import start as start_kakao
+import seed
+
+# (작업, 가중치) — 카드 새로고침이 대부분이고 쓰기는 드묾
+MIX = [("refresh_view", 50), ("pwa_shell", 10), ("api_events", 10), ("toggle_join", 15), ("search", 10), ("save_event", 3), ("login", 2)]
+KEYWORDS = ["영일대", "포항역", "죽도시장", "환호공원", "송도해수욕장"] + [f"카페 {i}" for i in range(50)]
+
+def setup_env(kakao_latency_ms):
+    # app import 전에 환경을 맞춰야 함: 가짜 카카오 주소, 로그인 제한 해제
+    srv, base = start_kakao(latency_ms=kakao_latency_ms)
+    os.environ["KAKAO_API_BASE"] = base; os.environ.setdefault("KAKAO_REST_API_KEY", "bench")
+    os.environ["LOGIN_LIMIT_IP"] = os.environ["LOGIN_LIMIT_EMAIL"] = "1000000"
+    return srv
+
+async def login(client, app, i):
+    r = await client.post("/login", data={"email": seed.bench_email(i), "password": seed.BENCH_PASSWORD})
+    token = r.cookies.get(app.COOKIE_NAME)
+    if not token: raise RuntimeError(f"login failed for bench user {i}: {r.headers.get('location')}")
+    return token
+
+async def user_loop(i, token, client, app, deadline, samples, errors, rnd, think_ms=0):
+    req = fake_gr_request(token, f"bench-{i}", app.COOKIE_NAME)
+    ops, weights = zip(*MIX)
+    while time.perf_counter() < deadline:
+        op = rnd.choices(ops, weights)[0]; t0 = time.perf_counter()
+        try:
+            if op == "refresh_view": await app.refresh_view(req)
+            elif op == "pwa_shell":
+                r = await client.get("/", cookies={app.COOKIE_NAME: token})
+                if r.status_code != 200: raise RuntimeError(r.status_code)
+            elif op == "api_events":
+                r = await client.get("/api/events", params={"limit": 20})
+                if r.status_code != 200: raise RuntimeError(r.status_code)
+            elif op == "toggle_join":
+                evs = await app.active_index.top(app.MAX_CARDS)
+                if evs: await app.toggle_join_gr(rnd.choice(evs)["id"], req)
+            elif op == "search": await app.search_place_logic(rnd.choice(KEYWORDS))
+            elif op == "save_event":
+                await app.save_event_gr(f"벤치 모임 {rnd.randint(1, 30)}", None, "포항시 벤치로 1", 10, False, (36.02 + rnd.random() / 50, 129.34 + rnd.random() / 50), req)
+            elif op == "login": token = await login(client, app, i); req = fake_gr_request(token, f"bench-{i}", app.COOKIE_NAME)
+        except Exception as e:
+            errors[op] += 1
+            if errors[op] <= 3: print(f"[{op}] {type(e).__name__}: {e}", file=sys.stderr)
+            if think_ms: await asyncio.sleep(think_ms / 1000)
+            continue
+        samples[op].append(time.perf_counter() - t0)
+        if think_ms: await asyncio.sleep(rnd.uniform(0, 2 * think_ms) / 1000)  # 사람의 조작 간격 (평균 think_ms)
+
+async def join_storm(app, users=200, capacity=20):
+    # 정원 capacity 인 활동 하나에 users 명이 동시에 참여 -> 참여자 수가 정원을 넘지 않고 카운터와 일치해야 함
+    h = app.pw_hash(seed.BENCH_PASSWORD, seed.BENCH_SALT); eid = "bench-storm"
+    async with app.get_acursor() as cur:
+        await cur.execute("DELETE FROM event_participants WHERE event_id=%s OR user_id LIKE 'bench-s%%'", (eid,))
+        await cur.execute("DELETE FROM events WHERE id=%s", (eid,))
+        await cur.execute("DELETE FROM users WHERE id LIKE 'bench-s%%'")
+        await cur.executemany("INSERT INTO users (id, email, pw_hash, name) VALUES (%s,%s,%s,%s)",
+                              [(f"bench-s{i}", f"bench-storm{i}@example.com", h, f"폭주{i}") for i in range(users)])
+        await cur.execute('INSERT INTO events (id,title,"start","end",addr,created_at,user_id,capacity,is_unlimited) VALUES (%s,%s,now(),now()+interval \'1 hour\',%s,now(),%s,%s,0)',
+                          (eid, "정원 검사", "포항시 벤치로 0", "bench-s0", capacity))
+    t0 = time.perf_counter()
+    res = await asyncio.gather(*(app.join_event(f"bench-s{i}", eid) for i in range(users)), return_exceptions=True)
+    wall = time.perf_counter() - t0
+    async with app.get_acursor() as cur:
+        await cur.execute("SELECT participant_count, (SELECT COUNT(*) FROM event_participants WHERE event_id=%s) FROM events WHERE id=%s", (eid, eid))
+        counter, rows = await cur.fetchone()
+        await cur.execute("DELETE FROM event_participants WHERE event_id=%s", (eid,))
+        await cur.execute("DELETE FROM events WHERE id=%s", (eid,))
+        await cur.execute("DELETE FROM users WHERE id LIKE 'bench-s%%'")
+    ok = rows == counter <= capacity and rows == min(users, capacity)
+    return {"users": users, "capacity": capacity, "joined_rows": rows, "participant_count": counter,
+            "errors": sum(isinstance(r, Exception) for r in res), "wall_s": round(wall, 3), "ok": ok}
+
+async def join_race(app, events=20):
+    # 한 사용자가 서로 다른 활동 events 개에 동시에 참여 -> 1인 1활동 규칙상 정확히 하나만 성공해야 함
+    uid, ids = "bench-r0", [f"bench-race{i}" for i in range(events)]
+    h = app.pw_hash(seed.BENCH_PASSWORD, seed.BENCH_SALT)
+    async def cleanup(cur):
+        await cur.execute("DELETE FROM event_participants WHERE user_id=%s OR event_id = ANY(%s)", (uid, ids))
+        await cur.execute("DELETE FROM events WHERE id = ANY(%s)", (ids,))
+        await cur.execute("DELETE FROM users WHERE id=%s", (uid,))
+    async with app.get_acursor() as cur:
+        await cleanup(cur)
+        await cur.execute("INSERT INTO users (id, email, pw_hash, name) VALUES (%s,%s,%s,%s)", (uid, "bench-race@example.com", h, "경쟁"))
+        await cur.executemany('INSERT INTO events (id,title,"start","end",addr,created_at,user_id,capacity,is_unlimited) VALUES (%s,%s,now(),now()+interval \'1 hour\',%s,now(),%s,10,0)',
+                              [(e, "1인 1활동 검사", "포항시 벤치로 0", uid) for e in ids])
+    t0 = time.perf_counter()
+    res = await asyncio.gather(*(app.join_event(uid, e) for e in ids), return_exceptions=True)
+    wall = time.perf_counter() - t0
+    async with app.get_acursor() as cur:
+        await cur.execute("SELECT (SELECT COUNT(*) FROM event_participants WHERE user_id=%s AND event_id = ANY(%s)), (SELECT COALESCE(SUM(participant_count), 0) FROM events WHERE id = ANY(%s))", (uid, ids, ids))
+        rows, counter = await cur.fetchone()
+        await cleanup(cur)
+    return {"events": events, "joined_rows": rows, "participant_count_sum": int(counter),
+            "errors": sum(isinstance(r, Exception) for r in res), "wall_s": round(wall, 3), "ok": rows == counter == 1}
+
+async def run(args, app):
+    import httpx
+    transport = httpx.ASGITransport(app=app.app, client=("127.0.0.1", 40000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        t0 = time.perf_counter()
+        sem = asyncio.Semaphore(app.HASH_WORKERS)  # 해시 풀 입장 제한(HashBusy)에 걸리지 않을 만큼만 동시에 로그인
+        async def warm_login(i):
+            async with sem: return await login(client, app, i)
+        tokens = await asyncio.gather(*(warm_login(i) for i in range(args.users)))
+        login_wall = time.perf_counter() - t0
+        samples, errors = defaultdict(list), defaultdict(int)
+        start = time.perf_counter(); deadline = start + args.seconds
+        await asyncio.gather(*(user_loop(i, tok, client, app, deadline, samples, errors, random.Random(i), args.think_ms) for i, tok in enumerate(tokens)))
+        wall = time.perf_counter() - start
+    total = sum(len(v) for v in samples.values())
+    out = {"args": vars(args), "wall_s": round(wall, 3), "login_warmup_s": round(login_wall, 3), "total_rps": round(total / wall, 2),
+           "ops": {op: summarize(samples[op], wall, errors[op]) for op, _ in MIX}}
+    out["db_acquires"] = {lv[0]: n for lv, n in app.DB_ACQUIRES.series.items()}  # 역할(primary/replica)별 커넥션 획득 수
+    if args.storm_users:
+        out["joinstorm"] = await join_storm(app, args.storm_users, args.storm_capacity)
+        out["joinrace"] = await join_race(app)
+    return out
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "compare": return compare(sys.argv[2], sys.argv[3])
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=50, help="동시 사용자 수 (시딩된 사용자 수 이하)")
+    ap.add_argument("--seconds", type=float, default=20)
+    ap.add_argument("--seed-users", type=int, default=500)
+    ap.add_argument("--seed-events", type=int, default=1000)
+    ap.add_argument("--no-seed", action="store_true", help="이미 시딩된 DB 를 그대로 사용")
+    ap.add_argument("--think-ms", type=float, default=0, help="사용자별 작업 사이 평균 대기(ms). 0 이면 쉬지 않고 반복")
+    ap.add_argument("--kakao-latency-ms", type=int, default=80)
+    ap.add_argument("--storm-users", type=int, default=200, help="0 이면 정원 동시성 검사 생략")
+    ap.add_argument("--storm-capacity", type=int, default=20)
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args()
+    if not os.getenv("DATABASE_URL"): sys.exit("DATABASE_URL 이 필요합니다 (로컬 Postgres)")
+    srv = setup_env(args.kakao_latency_ms)
+    if not args.no_seed: seed.seed(os.environ["DATABASE_URL"].replace("postgres://", "postgresql://", 1), max(args.seed_users, args.users), args.seed_events)
+    import app
+    out = asyncio.run(run(args, app))
+    out["kakao_upstream_requests"] = srv.requests
+    print(f"{'op':<14} {'count':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}  (ms)")
+    for op, s in out["ops"].items():
+        print(f"{op:<14} {s['count']:>7} {s['errors']:>5} {s['rps']:>8} {s['p50_ms']:>8} {s['p95_ms']:>8} {s['p99_ms']:>8}")
+    print(f"total rps={out['total_rps']}  kakao upstream={srv.requests}")
+    if "joinstorm" in out: print(f"joinstorm: {out['joinstorm']}\njoinrace: {out['joinrace']}")
+    print("saved", write_results("load", out, args.out))
+    if "joinstorm" in out and not (out["joinstorm"]["ok"] and out["joinrace"]["ok"]): sys.exit(1)
+
+if __name__ == "__main__":
+    main()
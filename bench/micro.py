@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+# 핫패스 마이크로 벤치: 비밀번호 해시, 사진 인코딩/디코딩, 캐시, 카드 새로고침의 DB/인덱스 경로.
+#   python bench/micro.py                      (DB 없이 가능한 항목만)
+#   DATABASE_URL=... python bench/micro.py     (get_live_joined_ids, active_index.top 포함, bench/seed.py 로 시딩된 DB)
+import os, sys, time, asyncio, argparse
+import numpy as np
+from common import summarize, write_results, compare
+
+def timeit(fn, n):
+    fn()  # 워밍업
+    s = []
+    for _ in range(n):
+        t0 = time.perf_counter(); fn(); s.append(time.perf_counter() - t0)
+    return summarize(s, sum(s))
+
+async def atimeit(fn, n):
+    await fn()
+    s = []
+    for _ in range(n):
+        t0 = time.perf_counter(); await fn(); s.append(time.perf_counter() - t0)
+    return summarize(s, sum(s))
+
+def run(args):
+    import app, imaging
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 255, (1080, 1920, 3), dtype=np.uint8)
+    b64 = app.encode_img_to_b64(img)
+    stored = app.pw_hash("bench-pass", "benchsalt")
+    cache = app.TTLCache(10000, 300)
+    for i in range(10000): cache.set(f"k{i}", i)
+    out = {"args": vars(args), "ops": {
+        "pw_hash": timeit(lambda: app.pw_hash("bench-pass", "benchsalt"), args.n_slow),
+        "pw_verify": timeit(lambda: app.pw_verify("bench-pass", stored), args.n_slow),
+        "encode_img_to_b64": timeit(lambda: app.encode_img_to_b64(img), args.n_slow),
+        "decode_photo": timeit(lambda: app.decode_photo(b64), args.n_slow),
+        "process_upload": timeit(lambda: imaging.process_upload(img), args.n_slow),
+        "ttlcache_get": timeit(lambda: cache.get("k5000"), args.n_fast),
+    }}
+    if os.getenv("DATABASE_URL"): out["ops"].update(asyncio.run(card_path(app, args.n_fast // 10)))
+    return out
+
+async def card_path(app, n):
+    # refresh_view 가 매번 하는 두 가지: 공용 인덱스에서 카드 목록, 사용자별 참여 중인 활동 한 번 조회
+    await app.active_index.ensure_fresh()
+    if not app.active_index.events: sys.exit("시딩된 활동이 없습니다: python bench/seed.py 먼저 실행")
+    return {"active_index.top": await atimeit(lambda: app.active_index.top(60), n * 10),
+            "get_live_joined_ids": await atimeit(lambda: app.get_live_joined_ids("bench-u1"), n)}
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "compare": return compare(sys.argv[2], sys.argv[3])
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n-slow", type=int, default=20, help="해시/이미지 반복 횟수")
+    ap.add_argument("--n-fast", type=int, default=2000, help="캐시/쿼리 반복 횟수")
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args()
+    out = run(args)
+    print(f"{'op':<20} {'count':>6} {'p50':>10} {'p95':>10} {'p99':>10}  (ms)")
+    for op, s in out["ops"].items(): print(f"{op:<20} {s['count']:>6} {s['p50_ms']:>10} {s['p95_ms']:>10} {s['p99_ms']:>10}")
+    print("saved", write_results("micro", out, args.out))
+
+if __name__ == "__main__":
+    main()
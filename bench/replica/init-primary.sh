@@ -0,0 +1,5 @@
+#!/bin/bash
+# 복제 전용 계정과 pg_hba 허용 규칙 (postgres 공식 이미지의 initdb 단계에서 실행)
+set -e
+psql -v ON_ERROR_STOP=1 -U postgres -c "CREATE ROLE repl WITH REPLICATION LOGIN PASSWORD 'repl';"
+echo "host replication repl all scram-sha-256" >> "$PGDATA/pg_hba.conf"
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+# 로컬 Postgres 에 벤치용 사용자/활동/참여자 생성. 모든 id 는 "bench-" 로 시작해 지우기 쉽다.
+#   docker run --rm -p 5432:5432 -e POSTGRES_PASSWORD=pw postgres:16
+#   DATABASE_URL=postgresql://postgres:pw@localhost/postgres python bench/seed.py --users 1000 --events 5000
+import os, random, argparse
+from datetime import timedelta
+import psycopg
+from common import ROOT  # noqa: F401  (sys.path 설정)
+
+BENCH_PASSWORD = "bench-pass"
+BENCH_SALT = "benchsalt"  # 사용자마다 PBKDF2 를 돌리면 시딩이 수 분 걸리므로 같은 해시를 공유
+
+def bench_email(i): return f"bench{i}@example.com"
+
+def clear(conn):
+    conn.execute("DELETE FROM event_participants WHERE user_id LIKE 'bench-%' OR event_id LIKE 'bench-%'")
+    conn.execute("DELETE FROM events WHERE id LIKE 'bench-%' OR user_id LIKE 'bench-%'")
+    conn.execute("DELETE FROM sessions WHERE user_id LIKE 'bench-%'")
+    conn.execute("DELETE FROM users WHERE id LIKE 'bench-%'")
+
+def seed(url, users=200, events=500, join_rate=0.5, rnd_seed=1):
+    import app  # 마이그레이션 적용 + pw_hash/now_kst 재사용
+    rnd = random.Random(rnd_seed); now = app.now_kst()
+    h = app.pw_hash(BENCH_PASSWORD, BENCH_SALT)
+    with psycopg.connect(url) as conn:
+        clear(conn)
+        with conn.cursor() as cur:
+            with cur.copy("COPY users (id, email, pw_hash, name, created_at) FROM STDIN") as cp:
+                for i in range(users): cp.write_row((f"bench-u{i}", bench_email(i), h, f"벤치{i}", now.isoformat()))
+            caps = {}
+            with cur.copy('COPY events (id, title, "start", "end", addr, lat, lng, created_at, user_id, capacity, is_unlimited) FROM STDIN') as cp:
+                for i in range(events):
+                    created = now - timedelta(minutes=rnd.uniform(0, 120))
+                    cap = rnd.randint(5, 50); unlim = int(rnd.random() < 0.1); caps[f"bench-e{i}"] = (cap, unlim)
+                    cp.write_row((f"bench-e{i}", f"벤치 활동 {i}", created, created + timedelta(minutes=rnd.uniform(30, 240)),
+                                  f"포항시 가상로 {i}", 36.0 + rnd.uniform(0, 0.1), 129.3 + rnd.uniform(0, 0.1), created, f"bench-u{i % users}", cap, unlim))
+            # 1인 1활동 규칙과 정원을 지키며 참여자 배정
+            left = {e: (10 ** 9 if u else c) for e, (c, u) in caps.items()}; ids = list(caps)
+            with cur.copy("COPY event_participants (event_id, user_id, joined_at) FROM STDIN") as cp:
+                for i in range(users):
+                    if rnd.random() >= join_rate or not ids: continue
+                    e = rnd.choice(ids)
+                    if left[e] <= 0: continue
+                    left[e] -= 1; cp.write_row((e, f"bench-u{i}", now))
+            cur.execute("UPDATE events e SET participant_count = (SELECT COUNT(*) FROM event_participants p WHERE p.event_id = e.id) WHERE e.id LIKE 'bench-%'")
+    return {"users": users, "events": events}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=200)
+    ap.add_argument("--events", type=int, default=500)
+    ap.add_argument("--join-rate", type=float, default=0.5)
+    ap.add_argument("--clear", action="store_true", help="벤치 데이터만 지우고 끝냄")
+    args = ap.parse_args()
+    url = os.environ["DATABASE_URL"]
+    if args.clear:
+        with psycopg.connect(url) as conn: clear(conn)
+    else: print(seed(url, args.users, args.events, args.join_rate))
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+# 위치 인덱스: 위경도 균일 격자. 반경 검색과 k-최근접 모두 가까운 칸부터 링 단위로 확장.
+# 순수 자료구조라 벤치/다른 도구가 app.py(gradio, DB 풀, 마이그레이션) 없이 import 할 수 있도록 따로 둔 모듈이다.
+import os, math
+
+GEO_CELL_DEG = float(os.getenv("GEO_CELL_DEG", "0.01"))  # 약 1.1km(위도 방향)
+GEO_MAX_RING = 50  # 반경 없이 k-최근접만 물을 때 최대로 넓힐 링 수
+def haversine_m(lat1, lng1, lat2, lng2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2
+    return 12742000 * math.asin(math.sqrt(a))
+
+class GeoIndex:
+    def __init__(self, cell_deg=GEO_CELL_DEG):
+        self.cell = cell_deg; self.cells = {}; self.where = {}  # where: id -> 칸 (증분 삭제/이동용)
+    def _key(self, lat, lng): return (math.floor(lat / self.cell), math.floor(lng / self.cell))
+    @property
+    def size(self): return len(self.where)
+    def add(self, eid, lat, lng):
+        # 이미 있는 id 면 새 위치로 옮김
+        if eid in self.where: self.remove(eid)
+        key = self._key(lat, lng)
+        self.cells.setdefault(key, []).append((eid, lat, lng)); self.where[eid] = key
+    def remove(self, eid):
+        key = self.where.pop(eid, None)
+        if key is None: return
+        cell = [t for t in self.cells[key] if t[0] != eid]
+        if cell: self.cells[key] = cell
+        else: del self.cells[key]
+    @staticmethod
+    def _ring(cy, cx, r):
+        if r == 0: yield (cy, cx); return
+        for dx in range(-r, r + 1): yield (cy - r, cx + dx); yield (cy + r, cx + dx)
+        for dy in range(-r + 1, r): yield (cy + dy, cx - r); yield (cy + dy, cx + r)
+    def nearby(self, lat, lng, radius_m=None, k=None):
+        # [(거리m, id), ...] 가까운 순. radius_m 와 k 는 함께 쓸 수 있음
+        cy, cx = self._key(lat, lng)
+        cell_m = self.cell * 111320 * max(math.cos(math.radians(min(abs(lat), 89))), 0.01)  # 칸의 짧은 변(경도 방향)
+        max_r = int(radius_m // cell_m) + 1 if radius_m else GEO_MAX_RING
+        found = []
+        for r in range(max_r + 1):
+            for key in self._ring(cy, cx, r):
+                for eid, la, ln in self.cells.get(key, ()):
+                    d = haversine_m(lat, lng, la, ln)
+                    if radius_m is None or d <= radius_m: found.append((d, eid))
+            if k and len(found) >= k:
+                found.sort()
+                if found[k - 1][0] <= r * cell_m: break  # 아직 안 본 링은 모두 r*cell_m 보다 멀다
+        found.sort()
+        return found[:k] if k else found
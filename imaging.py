@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+# 업로드 사진 인코딩 파이프라인 (PIL 만 사용).
+# 프로세스 풀 자식이 app.py(gradio, DB 풀) 전체를 다시 import 하지 않도록 따로 둔 모듈이다.
+import io, hashlib
+from PIL import Image
+
+try: import pillow_avif  # noqa: F401  (Pillow 가 AVIF 를 직접 지원하지 않을 때의 플러그인)
+except ImportError: pass
+
+SIZES = {"thumb": 640, "full": 1600}  # 변형별 긴 변 최대 픽셀
+MAX_PIXELS = 40_000_000  # 이보다 큰 업로드는 거절
+JPEG_QUALITY = {"thumb": 78, "full": 82}
+WEBP_QUALITY = 75
+AVIF_QUALITY = 55
+
+def avif_supported():
+    # 내장 AVIF(Pillow 11.2+)와 pillow-avif-plugin 모두 저장 플러그인으로 등록되므로 Image.SAVE 로 판단.
+    # (구버전 features.check("avif") 는 모르는 기능이면 예외 없이 경고 후 False 라 플러그인을 놓침)
+    Image.init()
+    return "AVIF" in Image.SAVE
+
+# (포맷, mime, 변형 이름 접미사). JPEG 는 예전 변형 이름("thumb", "full")을 그대로 쓴다
+FORMATS = [("JPEG", "image/jpeg", "")] + [("WEBP", "image/webp", ".webp")] + ([("AVIF", "image/avif", ".avif")] if avif_supported() else [])
+
+def _encode(im, fmt, size_name):
+    buf = io.BytesIO()
+    if fmt == "JPEG": im.save(buf, format="JPEG", quality=JPEG_QUALITY[size_name], optimize=True, progressive=True)
+    elif fmt == "WEBP": im.save(buf, format="WEBP", quality=WEBP_QUALITY, method=4)
+    else: im.save(buf, format="AVIF", quality=AVIF_QUALITY, speed=6)
+    return buf.getvalue()
+
+def encode_variants(im):
+    # 크기별·포맷별로 인코딩해 (hash, [(variant, mime, bytes), ...]) 반환.
+    # 픽셀만 다시 저장하므로 EXIF/ICC 등 메타데이터는 남지 않는다.
+    im = im.convert("RGB")
+    im.thumbnail((SIZES["full"], SIZES["full"]))  # 큰 원본은 먼저 줄여 이후 작업량을 줄임
+    out = []
+    for size_name, side in SIZES.items():
+        sized = im if size_name == "full" else im.resize(_fit(im.size, side), Image.LANCZOS)
+        for fmt, mime, suffix in FORMATS:
+            out.append((size_name + suffix, mime, _encode(sized, fmt, size_name)))
+    h = hashlib.sha256(next(d for v, _, d in out if v == "full")).hexdigest()[:32]
+    return h, out
+
+def _fit(wh, side):
+    w, h = wh
+    r = min(1.0, side / max(w, h))
+    return max(1, round(w * r)), max(1, round(h * r))
+
+def process_upload(img_np):
+    # 프로세스 풀에서 실행: numpy 배열 -> encode_variants 결과. 너무 크면 None
+    if img_np is None or img_np.shape[0] * img_np.shape[1] > MAX_PIXELS: return None
+    return encode_variants(Image.fromarray(img_np.astype("uint8")))